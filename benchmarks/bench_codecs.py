@@ -0,0 +1,210 @@
+#!/usr/bin/python3
+"""bench_codecs.py
+
+Reproducible benchmark of the zip path, builds synthetic solution trees and records throughput,
+compression ratio and peak RSS for each compression backend and level
+
+    python benchmarks/bench_codecs.py --output results.json
+    python benchmarks/bench_codecs.py --baseline results.json --tolerance 0.15
+
+Each case runs in a fresh process so peak RSS isn't polluted by earlier cases. With --baseline
+the run exits non-zero if any case lost more throughput than the tolerance allows
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import resource
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import pyzipper
+
+from solution_zipper import zip_solution
+from solution_zipper.compression import COMPRESSION_TYPES
+
+DEFAULT_SEED = 154
+MB = 1048576
+CASES = {
+    'stored': [None],
+    'deflate': [1, 6, 9],
+    'bzip2': [1, 9],
+    'lzma': [0, 6],
+}
+WORDS = ('nmap', 'port', 'open', 'http', 'ssh', 'user', 'root', 'flag', 'exploit', 'shell',
+    'payload', 'reverse', 'privesc', 'sudo', 'cron', 'password', 'hash', 'crack', 'enum', 'smb',
+    'the', 'a', 'to', 'and', 'found', 'running', 'version', 'service', 'login', 'admin')
+
+def _notes(rng: random.Random, size: int) -> bytes:
+    """Markdown-ish text notes"""
+    lines = []
+    total = 0
+    while total < size:
+        line = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 14)))
+        lines.append(f'- {line}\n')
+        total += len(lines[-1])
+    return ''.join(lines).encode('ascii')[:size]
+
+def _pcap(rng: random.Random, size: int) -> bytes:
+    """Capture with a mix of plaintext HTTP-like packets and random TLS-like packets"""
+    out = io.BytesIO()
+    out.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1))
+    stamp = 1700000000
+    while out.tell() < size:
+        if rng.random() < 0.4:
+            payload = b'GET /' + _notes(rng, rng.randint(200, 1200)) + b' HTTP/1.1\r\n\r\n'
+        else:
+            payload = rng.randbytes(rng.randint(200, 1400))
+        frame = bytes(14) + b'\x45\x00' + bytes(18) + bytes(20) + payload
+        stamp += 1
+        out.write(struct.pack('<IIII', stamp, rng.randint(0, 999999), len(frame), len(frame)))
+        out.write(frame)
+    return out.getvalue()[:size]
+
+def build_tree(tree: str, root: Path, rng: random.Random, scale: float) -> Path:
+    """
+    build_tree Creates one of the synthetic solution trees
+
+    Args:
+        tree (str): Kind of tree, small_notes, pcaps or mixed
+        root (Path): Directory to create the solution directory in
+        rng (random.Random): Random generator seeded for this tree alone
+        scale (float): Multiplier for file counts and sizes
+
+    Returns:
+        Path: Path to created solution directory
+    """
+    solution_dir = root.joinpath(tree)
+    solution_dir.mkdir(parents=True)
+    files: dict[str, bytes] = {}
+    if tree=='small_notes':
+        for i in range(int(2000 * scale)):
+            files[f'scans/dir_{i % 40}/note_{i}.md'] = _notes(rng, rng.randint(1024, 8192))
+    elif tree=='pcaps':
+        for i in range(4):
+            files[f'captures/capture_{i}.pcap'] = _pcap(rng, int(32 * MB * scale))
+    elif tree=='mixed':
+        for i in range(int(300 * scale)):
+            files[f'notes/note_{i}.md'] = _notes(rng, rng.randint(1024, 16384))
+        files['captures/traffic.pcap'] = _pcap(rng, int(16 * MB * scale))
+        for i in range(4):
+            files[f'loot/scan_{i}.gz'] = zlib.compress(_notes(rng, int(2 * MB * scale)))
+            files[f'loot/binary_{i}'] = rng.randbytes(int(4 * MB * scale))
+    else:
+        raise ValueError(f"Unknown tree {tree}")
+    for name, data in files.items():
+        f_path = solution_dir.joinpath(name)
+        f_path.parent.mkdir(parents=True, exist_ok=True)
+        f_path.write_bytes(data)
+    return solution_dir
+
+def _run_case(solution_dir: Path, codec: str, level: int|None, workers: int|None,
+        repeat: int) -> dict:
+    """Runs inside a fresh process, zips the tree `repeat` times"""
+    input_bytes = sum(f.stat().st_size for f in solution_dir.rglob('*') if f.is_file())
+    zip_path = solution_dir.parent.joinpath(f'{solution_dir.name}.zip')
+    timings = []
+    for _ in range(repeat):
+        zip_path.unlink(missing_ok=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            zip_solution(solution_dir, 'benchmark', workers=workers,
+                compression=COMPRESSION_TYPES[codec], compresslevel=level)
+            timings.append(time.perf_counter() - start)
+    output_bytes = zip_path.stat().st_size
+    zip_path.unlink()
+    seconds = statistics.median(timings)
+    return {
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'seconds': seconds,
+        'throughput_mb_s': input_bytes / MB / seconds,
+        'ratio': output_bytes / input_bytes,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+def _compare(results: dict[str, dict], baseline_path: Path, tolerance: float) -> list[str]:
+    """Lists cases whose throughput dropped more than tolerance below the baseline"""
+    with baseline_path.open('r', encoding='utf-8') as baseline_ref:
+        baseline = json.load(baseline_ref)['results']
+    regressions = []
+    for case, result in results.items():
+        if case not in baseline:
+            continue
+        previous = baseline[case]['throughput_mb_s']
+        if result['throughput_mb_s'] < previous * (1 - tolerance):
+            regressions.append(f"{case}: {result['throughput_mb_s']:.1f} MB/s, "\
+                + f"baseline {previous:.1f} MB/s")
+    return regressions
+
+def main():
+    """Main method"""
+    parser = argparse.ArgumentParser(prog='bench_codecs')
+    parser.add_argument('--trees', nargs='+', default=['small_notes', 'pcaps', 'mixed'],
+        choices=['small_notes', 'pcaps', 'mixed'], help="Synthetic trees to benchmark")
+    parser.add_argument('--codecs', nargs='+', default=list(CASES), choices=list(CASES),
+        help="Compression backends to benchmark")
+    parser.add_argument('--scale', type=float, default=1.0,
+        help="Multiplier for synthetic tree file counts and sizes")
+    parser.add_argument('--workers', type=int, default=None,
+        help="Threads compressing members, default is CPU count")
+    parser.add_argument('--repeat', type=int, default=3,
+        help="Runs per case, median time is reported")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+        help="Seed for synthetic data")
+    parser.add_argument('--output', default=None, help="Path to write JSON results to")
+    parser.add_argument('--baseline', default=None,
+        help="Previous JSON results to check for throughput regressions")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+        help="Allowed throughput drop against baseline, as a fraction")
+    options = parser.parse_args()
+    work_dir = Path(tempfile.mkdtemp(prefix='solution_zipper_bench_'))
+    results: dict[str, dict] = {}
+    try:
+        # Each tree gets its own generator, so its data doesn't depend on which trees came first
+        trees = {tree: build_tree(tree, work_dir, random.Random(f'{options.seed}:{tree}'),
+            options.scale) for tree in options.trees}
+        print(f"{'case':<24}{'MB/s':>10}{'ratio':>8}{'peak RSS MB':>13}")
+        for tree, solution_dir in trees.items():
+            for codec in options.codecs:
+                for level in CASES[codec]:
+                    case = f'{tree}/{codec}' + (f'-{level}' if level is not None else '')
+                    # Fresh process per case so peak RSS is per case
+                    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as executor:
+                        result = executor.submit(_run_case, solution_dir, codec, level,
+                            options.workers, options.repeat).result()
+                    results[case] = result
+                    print(f"{case:<24}{result['throughput_mb_s']:>10.1f}"\
+                        + f"{result['ratio']:>8.3f}{result['peak_rss_kb'] / 1024:>13.1f}")
+    finally:
+        shutil.rmtree(work_dir)
+    report = {
+        'python': sys.version.split()[0],
+        'pyzipper': getattr(pyzipper, '__version__', 'unknown'),
+        'seed': options.seed,
+        'scale': options.scale,
+        'workers': options.workers,
+        'results': results,
+    }
+    if options.output is not None:
+        with open(options.output, 'w', encoding='utf-8') as output_ref:
+            json.dump(report, output_ref, indent=2)
+    if options.baseline is not None:
+        regressions = _compare(results, Path(options.baseline), options.tolerance)
+        for regression in regressions:
+            print(f"Regression {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""bench_startup.py
+
+Startup cost of the zip_solution entry point per subcommand, runs the CLI under
+`python -X importtime` and records import time, wall time and which heavy dependencies loaded
+
+    python benchmarks/bench_startup.py --output startup.json
+    python benchmarks/bench_startup.py --baseline startup.json --tolerance 0.25
+
+Exits non-zero if a case imports a dependency it shouldn't, or with --baseline if a case's import
+time grew more than the tolerance allows
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HEAVY_MODULES = ('git', 'pyzipper')
+# Case name to CLI arguments and the heavy modules it's allowed to import
+CASES = {
+    'help': (['--help'], ()),
+    'bad_args': (['zipper'], ()),
+    'zipper_help': (['zipper', '--help'], ()),
+    'manage_help': (['manage_solution', 'zip_and_store', '--help'], ()),
+    'zipper': (['zipper', '{solution_dir}', '--password', 'benchmark'], ('pyzipper',)),
+    'extract': (['extract', '{zip_path}', '--password', 'benchmark', '--output_dir',
+        '{output_dir}'], ('pyzipper',)),
+}
+
+def _parse_importtime(stderr: str) -> tuple[int, set[str]]:
+    """
+    _parse_importtime Reads `-X importtime` output
+
+    Args:
+        stderr (str): Standard error of the run
+
+    Returns:
+        tuple[int, set[str]]: Total cumulative import time in microseconds and top level
+            packages imported
+    """
+    total_us = 0
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented, only top level ones add to the total
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+        packages.add(name.strip().split('.')[0])
+    return total_us, packages
+
+def _run_case(args: list[str]) -> dict:
+    """Runs the CLI once in a fresh interpreter"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'solution_zipper.cli',
+        *args], capture_output=True, text=True, check=False)
+    seconds = time.perf_counter() - start
+    import_us, packages = _parse_importtime(proc.stderr)
+    return {
+        'seconds': seconds,
+        'import_ms': import_us / 1000,
+        'returncode': proc.returncode,
+        'heavy_imports': sorted(package for package in HEAVY_MODULES if package in packages),
+    }
+
+def _compare(results: dict[str, dict], baseline_path: Path, tolerance: float) -> list[str]:
+    """Lists cases whose import time grew more than tolerance above the baseline"""
+    with baseline_path.open('r', encoding='utf-8') as baseline_ref:
+        baseline = json.load(baseline_ref)['results']
+    regressions = []
+    for case, result in results.items():
+        if case not in baseline:
+            continue
+        previous = baseline[case]['import_ms']
+        if result['import_ms'] > previous * (1 + tolerance):
+            regressions.append(f"{case}: {result['import_ms']:.1f} ms, "\
+                + f"baseline {previous:.1f} ms")
+    return regressions
+
+def main():
+    """Main method"""
+    parser = argparse.ArgumentParser(prog='bench_startup')
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES),
+        help="Subcommands to benchmark")
+    parser.add_argument('--repeat', type=int, default=5,
+        help="Runs per case, median is reported")
+    parser.add_argument('--output', default=None, help="Path to write JSON results to")
+    parser.add_argument('--baseline', default=None,
+        help="Previous JSON results to check for import time regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+        help="Allowed import time growth against baseline, as a fraction")
+    options = parser.parse_args()
+    results: dict[str, dict] = {}
+    failures = []
+    with tempfile.TemporaryDirectory(prefix='solution_zipper_startup_') as work_dir:
+        solution_dir = Path(work_dir).joinpath('solution')
+        solution_dir.mkdir()
+        solution_dir.joinpath('notes.md').write_text('startup benchmark\n', encoding='utf-8')
+        paths = {'solution_dir': str(solution_dir), 'zip_path': f'{solution_dir}.zip',
+            'output_dir': str(Path(work_dir).joinpath('extracted'))}
+        print(f"{'case':<16}{'import ms':>11}{'wall ms':>10}  heavy imports")
+        for case in options.cases:
+            args, allowed = CASES[case]
+            args = [arg.format(**paths) for arg in args]
+            runs = []
+            for _ in range(options.repeat):
+                Path(paths['zip_path']).unlink(missing_ok=True)
+                if case=='extract':
+                    subprocess.run([sys.executable, '-m', 'solution_zipper.cli',
+                        *[arg.format(**paths) for arg in CASES['zipper'][0]]],
+                        capture_output=True, check=True)
+                runs.append(_run_case(args))
+            result = {
+                'seconds': statistics.median(run['seconds'] for run in runs),
+                'import_ms': statistics.median(run['import_ms'] for run in runs),
+                'returncode': runs[-1]['returncode'],
+                'heavy_imports': runs[-1]['heavy_imports'],
+            }
+            results[case] = result
+            print(f"{case:<16}{result['import_ms']:>11.1f}{result['seconds'] * 1000:>10.1f}  "\
+                + (', '.join(result['heavy_imports']) or '-'))
+            unexpected = set(result['heavy_imports']) - set(allowed)
+            if unexpected:
+                failures.append(f"{case} imported {', '.join(sorted(unexpected))}")
+    report = {
+        'python': sys.version.split()[0],
+        'repeat': options.repeat,
+        'results': results,
+    }
+    if options.output is not None:
+        with open(options.output, 'w', encoding='utf-8') as output_ref:
+            json.dump(report, output_ref, indent=2)
+    if options.baseline is not None:
+        failures.extend(f"Regression {regression}" for regression
+            in _compare(results, Path(options.baseline), options.tolerance))
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
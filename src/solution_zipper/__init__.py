@@ -1,2 +1,51 @@
-from .git_solutions import (add_new_challenges_repo,
-                            configure_solution_info_repo, zip_and_store, create_zip_file)
+"""solution_zipper
+
+Zips and encrypts challenge solutions, optionally storing them in git repos. Public names are
+imported on first use so importing the package doesn't pull in pyzipper or GitPython
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .extract import extract_zip
+    from .metrics import MetricsCollector, format_report
+    from .verify import VerifyResult, verify_zip, verify_zips
+    from .git_solutions import (add_new_challenges_repo, configure_solution_info_repo,
+                                verify_solution_info_repo, zip_and_store, zip_and_store_many)
+    from .solution_zipper import (ZipResult, create_zip_file, create_zip_files,
+                                  find_solution_dirs, zip_solution)
+
+_LAZY_NAMES = {
+    'add_new_challenges_repo': '.git_solutions',
+    'configure_solution_info_repo': '.git_solutions',
+    'verify_solution_info_repo': '.git_solutions',
+    'zip_and_store': '.git_solutions',
+    'zip_and_store_many': '.git_solutions',
+    'create_zip_file': '.solution_zipper',
+    'ZipResult': '.solution_zipper',
+    'create_zip_files': '.solution_zipper',
+    'find_solution_dirs': '.solution_zipper',
+    'zip_solution': '.solution_zipper',
+    'extract_zip': '.extract',
+    'MetricsCollector': '.metrics',
+    'format_report': '.metrics',
+    'VerifyResult': '.verify',
+    'verify_zip': '.verify',
+    'verify_zips': '.verify',
+}
+# Literal so linters see the TYPE_CHECKING imports as re-exports, kept in step with _LAZY_NAMES
+__all__ = ['add_new_challenges_repo', 'configure_solution_info_repo', 'verify_solution_info_repo',
+    'zip_and_store', 'zip_and_store_many', 'create_zip_file', 'ZipResult', 'create_zip_files',
+    'find_solution_dirs', 'zip_solution', 'extract_zip', 'MetricsCollector', 'format_report',
+    'VerifyResult', 'verify_zip', 'verify_zips']
+
+def __getattr__(name: str):
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_NAMES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_LAZY_NAMES])
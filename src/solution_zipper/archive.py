@@ -0,0 +1,328 @@
+"""archive.py
+
+Contains the engine for compressing and encrypting zip members concurrently, workers build
+finished entries and a single writer appends them to the archive in a deterministic order
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['ArchiveMember', 'CarriedMember', 'append_member', 'encode_members', 'write_members']
+
+import copy
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zlib
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+import pyzipper
+from pyzipper.zipfile import (_FH_EXTRA_FIELD_LENGTH, _FH_FILENAME_LENGTH, _FH_SIGNATURE,
+                              _MASK_COMPRESS_OPTION_1, _MASK_ENCRYPTED, sizeFileHeader,
+                              stringFileHeader, structFileHeader)
+from pyzipper.zipfile_aes import AESZipInfo
+
+from .compression import get_compressor, select_codec
+from .manifest import content_hasher
+from .metrics import MetricsCollector
+
+CHUNK_SIZE = 1048576 # 1MB
+SPOOL_SIZE = 16777216 # 16MB, encoded members larger than this spill to a temp file
+
+@dataclass
+class ArchiveMember:
+    """File on disk to be stored in the archive"""
+    path: Path
+    arcname: str
+    size: int
+    mtime: float
+    mode: int
+
+@dataclass
+class CarriedMember:
+    """Entry of an existing archive copied over byte-for-byte, without re-encoding"""
+    source: BinaryIO
+    zinfo: AESZipInfo
+
+@dataclass
+class _EncodedMember:
+    """Compressed and encrypted member waiting to be appended by the writer"""
+    zinfo: AESZipInfo
+    payload: tempfile.SpooledTemporaryFile
+    decision: str
+    compress_seconds: float = 0.0
+    encrypt_seconds: float = 0.0
+    member: ArchiveMember|None = None
+    content_hash: str|None = None
+
+def _encode_member(member: ArchiveMember, compress_type: int, compresslevel: int|None,
+        encrypter_factory: Callable|None, hash_key: bytes|None=None) -> _EncodedMember:
+    """
+    _encode_member Compresses and encrypts a single member into a spooled buffer, safe to run
+    from worker threads as zlib, bz2, lzma and the AES/HMAC primitives release the GIL. Codec is
+    picked from the first chunk, so already compressed files are stored
+
+    Args:
+        member (ArchiveMember): Member to encode
+        compress_type (int): Requested zip compression type
+        compresslevel (int | None): Compression level, None for codec default
+        encrypter_factory (Callable | None): Creates a new encrypter, None for no encryption
+        hash_key (bytes | None, optional): Key to hash the contents with while they are read,
+            for the update manifest. Defaults to None, no hash.
+
+    Returns:
+        _EncodedMember: Zip info with sizes and CRC filled in along with the encoded payload,
+            description of the codec decision and content hash
+    """
+    with member.path.open('rb') as src_ref:
+        chunk = src_ref.read(CHUNK_SIZE)
+        compress_type, decision = select_codec(member.arcname, chunk, compress_type)
+        zinfo = AESZipInfo(member.arcname, time.localtime(member.mtime)[0:6])
+        zinfo.external_attr = (member.mode & 0xFFFF) << 16
+        zinfo.compress_type = compress_type
+        zinfo._compresslevel = compresslevel # pylint: disable=protected-access
+        zinfo.flag_bits = 0x00
+        encrypter = None
+        if encrypter_factory is not None:
+            zinfo.flag_bits |= _MASK_ENCRYPTED
+            encrypter = encrypter_factory()
+            encrypter.update_zipinfo(zinfo)
+        if compress_type == pyzipper.ZIP_LZMA:
+            # Compressed data includes an end-of-stream (EOS) marker
+            zinfo.flag_bits |= _MASK_COMPRESS_OPTION_1
+        compressor = get_compressor(compress_type, compresslevel)
+        payload = tempfile.SpooledTemporaryFile(SPOOL_SIZE)
+        if encrypter is not None:
+            payload.write(encrypter.encryption_header())
+        file_size = 0
+        crc = 0
+        hasher = content_hasher(hash_key) if hash_key is not None else None
+        compress_seconds = encrypt_seconds = 0.0
+        while chunk:
+            file_size += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+            if hasher is not None:
+                hasher.update(chunk)
+            if compressor is not None:
+                start = time.perf_counter()
+                chunk = compressor.compress(chunk)
+                compress_seconds += time.perf_counter() - start
+            if encrypter is not None:
+                start = time.perf_counter()
+                chunk = encrypter.encrypt(chunk)
+                encrypt_seconds += time.perf_counter() - start
+            payload.write(chunk)
+            chunk = src_ref.read(CHUNK_SIZE)
+    start = time.perf_counter()
+    tail = compressor.flush() if compressor is not None else b''
+    compress_seconds += time.perf_counter() - start
+    if encrypter is not None:
+        start = time.perf_counter()
+        tail = encrypter.encrypt(tail) + encrypter.flush()
+        encrypt_seconds += time.perf_counter() - start
+    payload.write(tail)
+    zinfo.file_size = file_size
+    zinfo.compress_size = payload.tell()
+    zinfo.CRC = crc
+    return _EncodedMember(zinfo, payload, decision, compress_seconds, encrypt_seconds, member,
+        hasher.hexdigest() if hasher is not None else None)
+
+def _append_encoded(zip_ref: pyzipper.AESZipFile, encoded: _EncodedMember) -> str:
+    """
+    _append_encoded Writer side, appends an encoded member to the archive and its central
+    directory, sizes are already known so no seeking back to patch the local header
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Encrypted zip file reference opened for writing
+        encoded (_EncodedMember): Member produced by `_encode_member`
+
+    Returns:
+        str: Description of the codec decision for the member
+    """
+    # pylint: disable=protected-access
+    zinfo = encoded.zinfo
+    print(f"Adding {zinfo.filename} to zip ({encoded.decision})")
+    with zip_ref._lock, encoded.payload as payload:
+        if zip_ref._seekable:
+            zip_ref.fp.seek(zip_ref.start_dir)
+        zinfo.header_offset = zip_ref.fp.tell()
+        zip_ref._writecheck(zinfo)
+        zip_ref._didModify = True
+        zip_ref.fp.write(zinfo.FileHeader())
+        payload.seek(0)
+        shutil.copyfileobj(payload, zip_ref.fp, CHUNK_SIZE)
+        zip_ref.start_dir = zip_ref.fp.tell()
+        zip_ref.filelist.append(zinfo)
+        zip_ref.NameToInfo[zinfo.filename] = zinfo
+    return encoded.decision
+
+def _append_carried(zip_ref: pyzipper.AESZipFile, carried: CarriedMember) -> str:
+    """
+    _append_carried Writer side, copies the local header and already compressed and encrypted
+    data of an entry from another archive, only the header offset is updated
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Encrypted zip file reference opened for writing
+        carried (CarriedMember): Entry to copy over
+
+    Raises:
+        BadZipFile: If the local header of the source entry is corrupt
+
+    Returns:
+        str: Description of the codec decision for the member
+    """
+    # pylint: disable=protected-access
+    zinfo = copy.copy(carried.zinfo)
+    print(f"Keeping {zinfo.filename} from previous zip")
+    carried.source.seek(zinfo.header_offset)
+    header = carried.source.read(sizeFileHeader)
+    fields = struct.unpack(structFileHeader, header)
+    if fields[_FH_SIGNATURE]!=stringFileHeader:
+        raise pyzipper.BadZipFile(f"Bad magic number for file header of {zinfo.filename}")
+    entry_left = fields[_FH_FILENAME_LENGTH] + fields[_FH_EXTRA_FIELD_LENGTH] \
+        + zinfo.compress_size
+    with zip_ref._lock:
+        if zip_ref._seekable:
+            zip_ref.fp.seek(zip_ref.start_dir)
+        zinfo.header_offset = zip_ref.fp.tell()
+        zip_ref._writecheck(zinfo)
+        zip_ref._didModify = True
+        zip_ref.fp.write(header)
+        while entry_left > 0:
+            chunk = carried.source.read(min(CHUNK_SIZE, entry_left))
+            if not chunk:
+                raise pyzipper.BadZipFile(f"Truncated data for {zinfo.filename}")
+            zip_ref.fp.write(chunk)
+            entry_left -= len(chunk)
+        zip_ref.start_dir = zip_ref.fp.tell()
+        zip_ref.filelist.append(zinfo)
+        zip_ref.NameToInfo[zinfo.filename] = zinfo
+    return 'carried over'
+
+def append_member(zip_ref: pyzipper.AESZipFile, item: CarriedMember|_EncodedMember,
+        metrics: MetricsCollector=None) -> tuple[str, str]:
+    """
+    append_member Writer side, appends a member produced by `encode_members` to the archive
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Encrypted zip file reference opened for writing
+        item (CarriedMember | _EncodedMember): Encoded or carried over member
+        metrics (MetricsCollector, optional): Collector to record the member in.
+            Defaults to None.
+
+    Returns:
+        tuple[str, str]: Name of the member and description of the codec decision
+    """
+    if isinstance(item, CarriedMember):
+        decision = _append_carried(zip_ref, item)
+    else:
+        decision = _append_encoded(zip_ref, item)
+    zinfo = zip_ref.filelist[-1]
+    if metrics is not None:
+        metrics.record_member(zinfo.filename, zinfo.file_size, zinfo.compress_size, decision,
+            getattr(item, 'compress_seconds', 0.0), getattr(item, 'encrypt_seconds', 0.0))
+    return zinfo.filename, decision
+
+def encode_members(zip_ref: pyzipper.AESZipFile,
+        members: Iterable[ArchiveMember|CarriedMember], workers: int=None,
+        hash_key: bytes=None) -> Iterator[CarriedMember|_EncodedMember]:
+    """
+    encode_members Compresses and encrypts members on a thread pool using the compression and
+    encryption settings of the zip file, yielding them in the order provided so output layout
+    doesn't depend on which worker finishes first. Carried members are passed through. Sizes of
+    yielded members are final, so they can be placed before being appended
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Encrypted zip file reference the settings come from, any
+            zip with the same settings and password can take the members
+        members (Iterable[ArchiveMember | CarriedMember]): Members to encode
+        workers (int, optional): Number of worker threads, 1 encodes inline.
+            Defaults to CPU count.
+        hash_key (bytes, optional): Key to hash member contents with while they are encoded.
+            Defaults to None, no hashes.
+
+    Raises:
+        ValueError: If number of workers isn't positive
+
+    Yields:
+        CarriedMember | _EncodedMember: Members ready to append, in provided order
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"Number of workers needs to be at least 1, got {workers}")
+    encrypter_factory = zip_ref.get_encrypter if zip_ref.encryption is not None else None
+    encode_args = (zip_ref.compression, zip_ref.compresslevel, encrypter_factory, hash_key)
+    if workers==1:
+        for member in members:
+            if isinstance(member, ArchiveMember):
+                member = _encode_member(member, *encode_args)
+            yield member
+        return
+    # Bounded look ahead so a huge tree doesn't queue every encoded member at once
+    pending: deque[Future|CarriedMember] = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for member in members:
+                if isinstance(member, ArchiveMember):
+                    member = executor.submit(_encode_member, member, *encode_args)
+                pending.append(member)
+                if len(pending) >= 2*workers:
+                    item = pending.popleft()
+                    yield item.result() if isinstance(item, Future) else item
+            while pending:
+                item = pending.popleft()
+                yield item.result() if isinstance(item, Future) else item
+        except BaseException:
+            # Includes the consumer closing early, queued encodes are dropped
+            for item in pending:
+                if isinstance(item, Future):
+                    item.cancel()
+            raise
+
+def write_members(zip_ref: pyzipper.AESZipFile,
+        members: Iterable[ArchiveMember|CarriedMember], workers: int=None,
+        metrics: MetricsCollector=None, entries: dict[str, dict]=None,
+        hash_key: bytes=None) -> dict[str, str]:
+    """
+    write_members Compresses and encrypts members on a thread pool using the compression and
+    encryption settings of the zip file, entries are appended in the order provided so output
+    layout doesn't depend on which worker finishes first. Carried members are copied as is
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Encrypted zip file reference opened for writing
+        members (Iterable[ArchiveMember | CarriedMember]): Members to add to the archive
+        workers (int, optional): Number of worker threads, 1 encodes inline.
+            Defaults to CPU count.
+        metrics (MetricsCollector, optional): Collector recording each member's sizes and
+            encoding times. Defaults to None.
+        entries (dict[str, dict], optional): Filled in with the size, mtime and content hash of
+            each encoded member, keyed by name in the archive, for the update manifest. Hashes
+            are taken while encoding so files aren't read twice. Defaults to None.
+        hash_key (bytes, optional): Key for the content hashes, required with `entries`.
+            Defaults to None.
+
+    Raises:
+        ValueError: If number of workers isn't positive or entries are asked for without a key
+
+    Returns:
+        dict[str, str]: Codec decision for each member, keyed by name in the archive
+    """
+    if entries is not None and hash_key is None:
+        raise ValueError("Manifest entries need a key to hash contents with")
+    decisions: dict[str, str] = {}
+    with closing(encode_members(zip_ref, members, workers,
+            hash_key if entries is not None else None)) as encoded:
+        for item in encoded:
+            name, decisions[name] = append_member(zip_ref, item, metrics)
+            if entries is not None and isinstance(item, _EncodedMember):
+                entries[name] = {'size': item.member.size, 'mtime': item.member.mtime,
+                    'hash': item.content_hash}
+    return decisions
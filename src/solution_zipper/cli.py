@@ -5,30 +5,217 @@ Contains main functions for using solution zipper as a cli tool
 """
 
 import argparse
+import json
 from pathlib import Path
 
-from .git_solutions import (add_new_challenges_repo,
-                           configure_solution_info_repo, zip_and_store)
-from .solution_zipper import create_zip_file
+# Subcommand modules pull in pyzipper and GitPython, they're imported only once a subcommand
+# needs them so --help and bad arguments stay fast. Keep in sync with compression.COMPRESSION_TYPES
+COMPRESSION_CHOICES = ['stored', 'deflate', 'bzip2', 'lzma']
 
+def _write_metrics(options: argparse.Namespace, metrics) -> None:
+    """Writes and prints the metrics report asked for, even when the run failed"""
+    from .metrics import format_report # pylint: disable=import-outside-toplevel
+    report = metrics.report()
+    if options.metrics_json is not None:
+        with open(options.metrics_json, 'w', encoding='utf-8') as metrics_ref:
+            json.dump(report, metrics_ref, indent=2)
+        print(f"Metrics written to {options.metrics_json}")
+    if options.profile:
+        print(format_report(report))
+
+def _load_config(options: argparse.Namespace):
+    """Loads the solution zipper config for looking up stored passwords"""
+    from .config import load_config # pylint: disable=import-outside-toplevel
+    return load_config(Path(options.config_path) if options.config_path is not None else None)
+
+def _run(options: argparse.Namespace, metrics) -> None:
+    """Runs the chosen subcommand"""
+    # pylint: disable=import-outside-toplevel
+    sub_command: str = options.sub_command
+    if sub_command=='zipper' and options.batch:
+        from .compression import COMPRESSION_TYPES
+        from .solution_zipper import create_zip_files, find_solution_dirs
+        solution_dirs = find_solution_dirs(Path(options.solution_dir), options.exclude_files)
+        results = create_zip_files(solution_dirs, options.password, options.exclude_files,
+            options.max_file_size, options.workers, options.update, options.gitignore,
+            options.dedupe, COMPRESSION_TYPES[options.compression], options.level, metrics,
+            options.solid, options.volume_size)
+        for solution_dir, result in results.items():
+            if result.ok:
+                print(f"{solution_dir.name}: {result.zip_path} password {result.password}")
+            else:
+                print(f"{solution_dir.name}: failed, {result.error}")
+        print(f"Zipped {sum(result.ok for result in results.values())}/{len(results)} solutions")
+    elif sub_command=='zipper':
+        from .compression import COMPRESSION_TYPES
+        from .solution_zipper import create_zip_file
+        ret_pass = create_zip_file(Path(options.solution_dir), options.password,
+            options.exclude_files, options.max_file_size, options.workers, options.update,
+            options.gitignore, options.dedupe, COMPRESSION_TYPES[options.compression],
+            options.level, metrics, options.solid, options.volume_size)
+        print(f"Password to decrypt zip: {ret_pass}")
+    elif sub_command=='extract':
+        from .extract import extract_zip
+        zip_path = Path(options.zip_path)
+        password = options.password
+        if password is None:
+            password = _load_config(options).lookup_password(zip_path)
+        output_dir = Path(options.output_dir) if options.output_dir is not None else None
+        extracted = extract_zip(zip_path, password, output_dir, options.members)
+        print(f"Extracted {len(extracted)} files")
+    elif sub_command=='verify':
+        from .verify import VerifyResult, verify_zips
+        from .volumes import INDEX_SUFFIX, load_index
+        zip_paths = []
+        failures: dict[Path, VerifyResult] = {}
+        for zip_path in map(Path, options.zip_paths):
+            if not zip_path.name.endswith(INDEX_SUFFIX):
+                zip_paths.append(zip_path)
+                continue
+            try:
+                # Volumes decrypt on their own, so each is verified separately
+                zip_paths.extend(zip_path.with_name(volume_name)
+                    for volume_name in load_index(zip_path))
+            except (OSError, ValueError) as index_err:
+                # A missing or malformed index fails on its own, the audit goes on
+                zip_paths.append(zip_path)
+                failures[zip_path] = VerifyResult(zip_path,
+                    error=f'{type(index_err).__name__}: {index_err}')
+        zip_passwords: dict[Path, str] = {}
+        if options.password is None:
+            config = _load_config(options)
+            for zip_path in zip_paths:
+                if zip_path in failures:
+                    continue
+                try:
+                    zip_passwords[zip_path] = config.lookup_password(zip_path)
+                except (FileNotFoundError, ValueError) as lookup_err:
+                    # One unmerged or unregistered zip shouldn't stop the rest of the audit
+                    failures[zip_path] = VerifyResult(zip_path,
+                        error=f'{type(lookup_err).__name__}: {lookup_err}')
+        else:
+            zip_passwords = {zip_path: options.password for zip_path in zip_paths
+                if zip_path not in failures}
+        verified = verify_zips(zip_passwords, options.workers)
+        results = {zip_path: verified.get(zip_path) or failures[zip_path]
+            for zip_path in zip_paths}
+        for zip_path, result in results.items():
+            if result.ok:
+                print(f"{zip_path}: ok, {result.members} members, {result.bytes_checked} bytes")
+            else:
+                print(f"{zip_path}: failed, {result.error}")
+        failed = sum(not result.ok for result in results.values())
+        if failed:
+            raise ValueError(f"{failed}/{len(results)} zips failed verification")
+        print(f"Verified {len(results)} zips")
+    elif sub_command=='manage_solution':
+        from .compression import COMPRESSION_TYPES
+        from .git_solutions import (add_new_challenges_repo, configure_solution_info_repo,
+            verify_solution_info_repo, zip_and_store, zip_and_store_many)
+        manage_action: str = options.management_action
+        config_option: str|None = options.config_path
+        if isinstance(config_option, str):
+            config_option = Path(config_option)
+        if manage_action=='configure':
+            configure_solution_info_repo(Path(options.solution_info_repo), config_option)
+        elif manage_action=='verify_private':
+            if not verify_solution_info_repo(config_option, options.refresh):
+                raise ValueError("Solutions info repo may not be private, check and try again")
+            print("Solutions info repo is still private")
+        elif manage_action=='add_challenge_repo':
+            add_new_challenges_repo(Path(options.challenge_repo), options.repo_name, config_option)
+        elif manage_action=='zip_and_store' and len(options.solution_dir) > 1:
+            results = zip_and_store_many([Path(solution_dir) for solution_dir in
+                options.solution_dir], config_option, options.password, options.exclude_files,
+                options.max_file_size, options.workers, options.gitignore, options.dedupe,
+                COMPRESSION_TYPES[options.compression], options.level, options.branch, metrics,
+                options.solid, options.volume_size)
+            for solution_dir, result in results.items():
+                if not result.ok:
+                    print(f"{solution_dir.name}: failed, {result.error}")
+        elif manage_action=='zip_and_store':
+            zip_and_store(Path(options.solution_dir[0]), config_option, options.password,
+                options.exclude_files, options.max_file_size, options.gitignore, options.dedupe,
+                COMPRESSION_TYPES[options.compression], options.level, metrics, options.solid,
+                options.volume_size)
+        else:
+            # How did we get here?
+            raise ValueError(f"Uknown management action {manage_action} provided")
+    else:
+        raise ValueError(f"Uknown command {sub_command} provided")
 
 def main():
     """Main method"""
     parser = argparse.ArgumentParser(prog='solution_zipper')
+    # Shared by the subcommands that zip
+    metrics_parser = argparse.ArgumentParser(add_help=False)
+    metrics_parser.add_argument('--profile', action='store_true',
+        help="Print a profile of walk, compression, encryption and git times when done")
+    metrics_parser.add_argument('--metrics_json', default=None,
+        help="Path to write a JSON report of per file and per phase metrics to")
     sub_parser = parser.add_subparsers(required= True, dest='sub_command',
         description="Valid zipper actions")
     # Simple zipping and output passwords
-    zipper_parser = sub_parser.add_parser('zipper',
+    zipper_parser = sub_parser.add_parser('zipper', parents=[metrics_parser],
         help="Just for base parser for zipping a solution and printing out zip password")
     zipper_parser.add_argument('solution_dir',
-        help="Path to directory containing solution to challenge")
+        help="Path to directory containing solution to challenge, or root of challenge tree "\
+            + "with --batch")
     zipper_parser.add_argument('--password', default=None,
         help="Password to encrypt the solution with, for CTF/HTB like challenges the flag "\
             + "is recommended")
     zipper_parser.add_argument('--max_file_size', type=int, default=None,
         help="Number of bytes a file can be to be added to solution zip file, default is 1GB")
     zipper_parser.add_argument('--exclude_files', nargs='+', default=None,
-        help="List of filenames to ignore/not store in zip")
+        help="List of filenames or gitignore style patterns to ignore/not store in zip")
+    zipper_parser.add_argument('--gitignore', action='store_true',
+        help="Honor .gitignore files in the solution along with .solutionignore ones")
+    zipper_parser.add_argument('--dedupe', action='store_true',
+        help="Store files with identical content once, use extract to recreate them")
+    zipper_parser.add_argument('--solid', action='store_true',
+        help="Store the tree as one tar in a single encrypted entry, best for many small "\
+            + "files, use extract to unpack it")
+    zipper_parser.add_argument('--volume_size', type=int, default=None,
+        help="Max bytes per zip, splits the solution into independently decryptable "\
+            + "<solution>.partNN.zip volumes with a <solution>.index.json listing them")
+    zipper_parser.add_argument('--compression', choices=COMPRESSION_CHOICES, default='deflate',
+        help="Compression backend for files, default is deflate")
+    zipper_parser.add_argument('--level', type=int, default=None,
+        help="Compression level, 0-9 for deflate and lzma, 1-9 for bzip2, default is the "\
+            + "backend's default")
+    zipper_parser.add_argument('--update', action='store_true',
+        help="Update an existing zip, only re-encoding changed files, requires --password")
+    zipper_parser.add_argument('--batch', action='store_true',
+        help="Treat solution_dir as a root and zip every solution directory under it")
+    zipper_parser.add_argument('--workers', type=int, default=None,
+        help="Number of workers, processes per solution with --batch otherwise threads "\
+            + "compressing files, default is CPU count")
+    # Extracting solution zips
+    extract_parser = sub_parser.add_parser('extract',
+        help="Extract a solution zip, recreating files stored once with --dedupe")
+    extract_parser.add_argument('zip_path',
+        help="Path to solution zip or volume index to extract")
+    extract_parser.add_argument('--password', default=None,
+        help="Password to decrypt the solution zip, default is the one stored in the solution "\
+            + "info repo")
+    extract_parser.add_argument('--output_dir', default=None,
+        help="Directory to extract into, default is the zip's directory")
+    extract_parser.add_argument('--members', nargs='+', default=None,
+        help="Names in the zip to extract, only these are decrypted, default is everything")
+    extract_parser.add_argument('--config_path', default=None,
+        help="Path to configuration file for solution_zipper, used to look up passwords")
+    # Verifying solution zips
+    verify_parser = sub_parser.add_parser('verify',
+        help="Decrypts and integrity checks solution zips without writing anything")
+    verify_parser.add_argument('zip_paths', nargs='+',
+        help="Paths to solution zips or volume indexes to verify")
+    verify_parser.add_argument('--password', default=None,
+        help="Password for every zip, default is each one's password stored in the solution "\
+            + "info repo")
+    verify_parser.add_argument('--workers', type=int, default=None,
+        help="Number of processes verifying zips, default is CPU count")
+    verify_parser.add_argument('--config_path', default=None,
+        help="Path to configuration file for solution_zipper, used to look up passwords")
     # For zipping and git actions
     git_zipper_parser = sub_parser.add_parser('manage_solution',
         help="For having the solutions fully managed and pushed to repo, just create PRs")
@@ -41,6 +228,13 @@ def main():
         help="Path to the solution info repo, does a check to make sure it's private")
     git_configure_parser.add_argument('--config_path', default=None,
         help="Path to configuration file for solution_zipper for handling gits fully")
+    ## Re-checking solution info repo privacy
+    git_verify_private_parser = git_zip_subparser.add_parser('verify_private',
+        help="Re-checks that the solution info repo can't be accessed anonymously")
+    git_verify_private_parser.add_argument('--refresh', action='store_true',
+        help="Ignore the cached result from the last day and check the remote again")
+    git_verify_private_parser.add_argument('--config_path', default=None,
+        help="Path to configuration file for solution_zipper for handling gits fully")
     ## Git zip adding challenge repos
     git_add_ch_repo_parser = git_zip_subparser.add_parser('add_challenge_repo',
         help="Add repo for challenges such as leetcode, HTB, etc.")
@@ -51,11 +245,12 @@ def main():
     git_add_ch_repo_parser.add_argument('--config_path', default=None,
         help="Path to configuration file for solution_zipper for handling gits fully")
     ## Git zip and store action
-    git_manage_solution = git_zip_subparser.add_parser('zip_and_store',
+    git_manage_solution = git_zip_subparser.add_parser('zip_and_store', parents=[metrics_parser],
         help="Zips the solution and stores it's password in private repo and pushes " \
             + "zip to challenge repo")
-    git_manage_solution.add_argument('solution_dir',
-        help="Path to directory containing solution to challenge")
+    git_manage_solution.add_argument('solution_dir', nargs='+',
+        help="Path to directory containing solution to challenge, several are stored with "\
+            + "one branch, commit and push per repo")
     git_manage_solution.add_argument('--config_path', default=None,
         help="Path to configuration file for solution_zipper for handling gits fully")
     git_manage_solution.add_argument('--password', default=None,
@@ -64,31 +259,37 @@ def main():
     git_manage_solution.add_argument('--max_file_size', type=int, default=None,
         help="Number of bytes a file can be to be added to solution zip file, default is 1GB")
     git_manage_solution.add_argument('--exclude_files', nargs='+', default=None,
-        help="List of filenames to ignore/not store in zip")
+        help="List of filenames or gitignore style patterns to ignore/not store in zip")
+    git_manage_solution.add_argument('--gitignore', action='store_true',
+        help="Honor .gitignore files in the solution along with .solutionignore ones")
+    git_manage_solution.add_argument('--dedupe', action='store_true',
+        help="Store files with identical content once, use extract to recreate them")
+    git_manage_solution.add_argument('--solid', action='store_true',
+        help="Store the tree as one tar in a single encrypted entry, best for many small "\
+            + "files, use extract to unpack it")
+    git_manage_solution.add_argument('--volume_size', type=int, default=None,
+        help="Max bytes per zip, splits solutions into volumes that are all committed, use "\
+            + "under 100MB for GitHub")
+    git_manage_solution.add_argument('--compression', choices=COMPRESSION_CHOICES,
+        default='deflate',
+        help="Compression backend for files, default is deflate")
+    git_manage_solution.add_argument('--level', type=int, default=None,
+        help="Compression level, 0-9 for deflate and lzma, 1-9 for bzip2, default is the "\
+            + "backend's default")
+    git_manage_solution.add_argument('--workers', type=int, default=None,
+        help="Number of processes zipping when storing several solutions, default is CPU count")
+    git_manage_solution.add_argument('--branch', default=None,
+        help="Branch name when storing several solutions, default is a timestamped name")
     options = parser.parse_args()
-    print(options)
-    sub_command: str = options.sub_command
-    if sub_command=='zipper':
-        ret_pass = create_zip_file(Path(options.solution_dir), options.password,
-            options.exclude_files, options.max_file_size)
-        print(f"Password to decrypt zip: {ret_pass}")
-    elif sub_command=='manage_solution':
-        manage_action: str = options.management_action
-        config_option: str|None = options.config_path
-        if isinstance(config_option, str):
-            config_option = Path(config_option)
-        if manage_action=='configure':
-            configure_solution_info_repo(Path(options.solution_info_repo), config_option)
-        elif manage_action=='add_challenge_repo':
-            add_new_challenges_repo(Path(options.challenge_repo), options.repo_name, config_option)
-        elif manage_action=='zip_and_store':
-            zip_and_store(Path(options.solution_dir), config_option, options.password,
-                options.exclude_files, options.max_file_size)
-        else:
-            # How did we get here?
-            raise ValueError(f"Uknown management action {manage_action} provided")
-    else:
-        raise ValueError(f"Uknown command {sub_command} provided")
+    metrics = None
+    if getattr(options, 'profile', False) or getattr(options, 'metrics_json', None) is not None:
+        from .metrics import MetricsCollector # pylint: disable=import-outside-toplevel
+        metrics = MetricsCollector()
+    try:
+        _run(options, metrics)
+    finally:
+        if metrics is not None:
+            _write_metrics(options, metrics)
 
 if __name__ == "__main__":
     main()
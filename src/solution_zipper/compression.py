@@ -0,0 +1,119 @@
+"""compression.py
+
+Contains the compression backends and levels available for zips, along with the per-member codec
+selection so files that are already compressed are stored instead of burning CPU on them again
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['COMPRESSION_NAMES', 'COMPRESSION_TYPES', 'check_compression', 'get_compressor',
+    'select_codec']
+
+import lzma
+import struct
+import zlib
+from pathlib import PurePath
+
+import pyzipper
+from pyzipper.zipfile import LZMACompressor, _get_compressor
+
+COMPRESSION_NAMES = {
+    pyzipper.ZIP_STORED: 'stored',
+    pyzipper.ZIP_DEFLATED: 'deflate',
+    pyzipper.ZIP_BZIP2: 'bzip2',
+    pyzipper.ZIP_LZMA: 'lzma',
+}
+COMPRESSION_TYPES = {name: compress_type for compress_type, name in COMPRESSION_NAMES.items()}
+LEVEL_RANGES = {
+    pyzipper.ZIP_DEFLATED: range(0, 10),
+    pyzipper.ZIP_BZIP2: range(1, 10),
+    pyzipper.ZIP_LZMA: range(0, 10),
+}
+# Archives, compressed streams and media formats, compressing these again gains next to nothing
+COMPRESSED_EXTENSIONS = frozenset([
+    '.7z', '.apk', '.br', '.bz2', '.cab', '.deb', '.docx', '.flac', '.gif', '.gz', '.jar',
+    '.jpeg', '.jpg', '.kdbx', '.lz', '.lz4', '.lzma', '.mkv', '.mov', '.mp3', '.mp4', '.odt',
+    '.ogg', '.pdf', '.png', '.pptx', '.rar', '.rpm', '.tbz2', '.tgz', '.txz',
+    '.webm', '.webp', '.whl', '.xlsx', '.xz', '.zip', '.zst',
+])
+SAMPLE_MIN_SIZE = 512 # Samples smaller than this aren't worth a trial compress
+MIN_SAVING = 0.05 # Trial compress has to save at least 5% to keep compressing
+
+class _PresetLZMACompressor(LZMACompressor):
+    """pyzipper's zip LZMA compressor ignores levels, this one uses the level as the preset"""
+
+    def __init__(self, preset: int):
+        super().__init__()
+        self._preset = preset
+
+    def _init(self):
+        # pylint: disable=protected-access
+        props = lzma._encode_filter_properties({'id': lzma.FILTER_LZMA1, 'preset': self._preset})
+        self._comp = lzma.LZMACompressor(lzma.FORMAT_RAW, filters=[
+            lzma._decode_filter_properties(lzma.FILTER_LZMA1, props)
+        ])
+        return struct.pack('<BBH', self.LZMA_SDK_MAJOR_VERSION, self.LZMA_SDK_MINOR_VERSION,
+            len(props)) + props
+
+def check_compression(compress_type: int, compresslevel: int|None) -> None:
+    """
+    check_compression Validates compression type and level before any work is done
+
+    Args:
+        compress_type (int): Zip compression type
+        compresslevel (int | None): Compression level, None for codec default
+
+    Raises:
+        ValueError: If compression type is unknown or level is out of range for it
+    """
+    if compress_type not in COMPRESSION_NAMES:
+        raise ValueError(f"Unsupported compression type {compress_type}")
+    if compresslevel is None:
+        return
+    if compress_type not in LEVEL_RANGES:
+        raise ValueError(f"{COMPRESSION_NAMES[compress_type]} doesn't take a level")
+    level_range = LEVEL_RANGES[compress_type]
+    if compresslevel not in level_range:
+        raise ValueError(f"{COMPRESSION_NAMES[compress_type]} level needs to be between "\
+            + f"{level_range.start} and {level_range.stop - 1}, got {compresslevel}")
+
+def get_compressor(compress_type: int, compresslevel: int|None):
+    """
+    get_compressor Creates compressor for a member, same as pyzipper's except LZMA honors level
+
+    Args:
+        compress_type (int): Zip compression type
+        compresslevel (int | None): Compression level, None for codec default
+
+    Returns:
+        Compressor object with `compress` and `flush`, None when storing
+    """
+    if compress_type==pyzipper.ZIP_LZMA and compresslevel is not None:
+        return _PresetLZMACompressor(compresslevel)
+    return _get_compressor(compress_type, compresslevel)
+
+def select_codec(arcname: str, sample: bytes, compress_type: int) -> tuple[int, str]:
+    """
+    select_codec Picks the codec for a member using extension rules and a fast trial compress
+    of the first chunk, falling back to `ZIP_STORED` when compressing won't help
+
+    Args:
+        arcname (str): Name of the member in the archive
+        sample (bytes): First chunk of the member's contents
+        compress_type (int): Requested zip compression type
+
+    Returns:
+        tuple[int, str]: Compression type to use and description of the decision
+    """
+    requested = COMPRESSION_NAMES.get(compress_type, str(compress_type))
+    if compress_type==pyzipper.ZIP_STORED:
+        return compress_type, requested
+    suffix = PurePath(arcname).suffix.lower()
+    if suffix in COMPRESSED_EXTENSIONS:
+        return pyzipper.ZIP_STORED, f'stored, {suffix} is already compressed'
+    if len(sample) < SAMPLE_MIN_SIZE:
+        return compress_type, requested
+    ratio = len(zlib.compress(sample, 1)) / len(sample)
+    if ratio > 1 - MIN_SAVING:
+        return pyzipper.ZIP_STORED, f'stored, sample ratio {ratio:.2f}'
+    return compress_type, requested
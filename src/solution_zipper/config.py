@@ -0,0 +1,172 @@
+"""config.py
+
+Contains the configuration layer for managed solutions, the config file is loaded once and cached
+until it changes on disk, and challenge repos are indexed by path for resolving solutions
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['RESERVED_NAME', 'SolutionConfig', 'get_config_path', 'load_config', 'save_config',
+    'write_json']
+
+import json
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+RESERVED_NAME = 'solution_info_repo'
+# Zips are `<solution>.zip`, volumes `<solution>.partNN.zip` listed in `<solution>.index.json`
+ZIP_NAME_PATTERN = re.compile(r'(?P<solution>.+?)(?:\.part\d+\.zip|\.index\.json|\.zip)')
+
+@dataclass
+class SolutionConfig:
+    """Loaded configuration, repo names to their local paths, indexed by path"""
+    path: Path
+    repos: dict[str, str]
+    stamp: tuple[int, int] = (0, 0)
+    _by_path: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        self._by_path = {str(Path(repo_path)): repo_name
+            for repo_name, repo_path in self.repos.items() if repo_name!=RESERVED_NAME}
+
+    @property
+    def solution_info_path(self) -> Path:
+        """Path to the private solution info repo"""
+        return Path(self.repos[RESERVED_NAME])
+
+    def locate_solution(self, solution_dir: Path) -> tuple[str, str]:
+        """
+        locate_solution Identifies the challenge repo a solution directory belongs to, the
+        deepest registered repo containing the solution wins so nested repos resolve exactly
+
+        Args:
+            solution_dir (Path): Resolved path to solution directory
+
+        Raises:
+            ValueError: Solution isn't inside any of the challenge repos
+
+        Returns:
+            tuple[str, str]: Name of the challenge repo and its local path
+        """
+        # Longest prefix first, walking up the ancestors is one lookup per directory level
+        for ancestor in solution_dir.parents:
+            repo_name = self._by_path.get(str(ancestor))
+            if repo_name is not None:
+                return repo_name, self.repos[repo_name]
+        raise ValueError(
+            f"Not able to locate solution in config file: {solution_dir}. Add and try again")
+
+    def lookup_password(self, zip_path: Path) -> str:
+        """
+        lookup_password Reads the password of a solution zip from the solution info repo, stored
+        as `<repo_name>/<solution_name>` by `zip_and_store`. Uses whatever branch is checked out
+
+        Args:
+            zip_path (Path): Path to solution zip, volume or volume index inside a challenge repo
+
+        Raises:
+            ValueError: Zip isn't inside any of the challenge repos
+            FileNotFoundError: No password is stored for the solution
+
+        Returns:
+            str: Password of the zip
+        """
+        zip_path = zip_path.absolute().resolve()
+        name_match = ZIP_NAME_PATTERN.fullmatch(zip_path.name)
+        solution_dir = zip_path.with_name(name_match['solution']) if name_match is not None \
+            else zip_path.with_suffix('')
+        repo_name, _ = self.locate_solution(solution_dir)
+        password_file = self.solution_info_path.joinpath(repo_name, solution_dir.name)
+        if not password_file.is_file():
+            raise FileNotFoundError(f"No password stored for {solution_dir.name} in {repo_name}")
+        return password_file.read_text(encoding='utf-8').strip()
+
+_CACHE: dict[Path, SolutionConfig] = {}
+
+def _stamp(config_path: Path) -> tuple[int, int]:
+    """Modification time and inode, atomic writes always change the inode even within a tick"""
+    config_stat = config_path.stat()
+    return config_stat.st_mtime_ns, config_stat.st_ino
+
+def get_config_path(config_path: Path=None) -> Path:
+    """
+    get_config_path Resolves the configuration file location
+
+    Args:
+        config_path (Path, optional): Configuration file path. Defaults to
+            `~/.solution_info/config.json`.
+
+    Returns:
+        Path: Configuration file path
+    """
+    if config_path is None:
+        config_path = Path.home().joinpath('.solution_info/config.json')
+    return config_path
+
+def load_config(config_path: Path=None) -> SolutionConfig:
+    """
+    load_config Reads the solution zipper configuration, cached per file until its mtime changes
+    or it's replaced
+
+    Args:
+        config_path (Path, optional): Configuration file path. Defaults to
+            `~/.solution_info/config.json`.
+
+    Raises:
+        FileNotFoundError: If configuration file isn't found
+
+    Returns:
+        SolutionConfig: Loaded configuration, shared between callers so don't modify it
+    """
+    config_path = get_config_path(config_path).absolute()
+    try:
+        stamp = _stamp(config_path)
+    except FileNotFoundError as not_found_err:
+        raise FileNotFoundError(
+            f"Cannot find configuration file at {config_path}") from not_found_err
+    cached = _CACHE.get(config_path)
+    if cached is not None and cached.stamp==stamp:
+        return cached
+    print("Checking configuration file")
+    with config_path.open('r', encoding='utf-8') as config_ref:
+        config = SolutionConfig(config_path, json.load(config_ref), stamp)
+    _CACHE[config_path] = config
+    return config
+
+def save_config(config_path: Path, repos: dict[str, str]) -> SolutionConfig:
+    """
+    save_config Writes the configuration atomically and refreshes the cache
+
+    Args:
+        config_path (Path): Configuration file path
+        repos (dict[str, str]): Repo names to their local paths
+
+    Returns:
+        SolutionConfig: Saved configuration
+    """
+    config_path = config_path.absolute()
+    write_json(config_path, repos)
+    config = SolutionConfig(config_path, dict(repos), _stamp(config_path))
+    _CACHE[config_path] = config
+    return config
+
+def write_json(f_path: Path, data: dict) -> None:
+    """
+    write_json Writes JSON atomically, temp file in the same directory is renamed over the
+    previous version
+
+    Args:
+        f_path (Path): Path to write to
+        data (dict): Data to write
+    """
+    tmp_fd, tmp_name = tempfile.mkstemp(prefix=f'.{f_path.name}.', dir=f_path.parent)
+    try:
+        with os.fdopen(tmp_fd, 'w', encoding='utf-8') as data_ref:
+            json.dump(data, data_ref, indent=2)
+        os.replace(tmp_name, f_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,116 @@
+"""dedupe.py
+
+Contains duplicate content detection for zip members, each distinct content is stored once and
+duplicates are recorded in a manifest inside the archive so they can be recreated on extract
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['DUPLICATES_NAME', 'dedupe_members', 'duplicates_manifest', 'restore_duplicates',
+    'write_duplicates']
+
+import json
+import os
+import shutil
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import pyzipper
+
+from .archive import ArchiveMember
+from .manifest import hash_file
+
+DUPLICATES_NAME = '.solution_zipper/duplicates.json'
+DUPLICATES_VERSION = 1
+DEDUPE_MIN_SIZE = 1024 # Smaller files cost less to store than to track
+
+def dedupe_members(members: Iterable[ArchiveMember],
+        duplicates: dict[str, dict]) -> Iterator[ArchiveMember]:
+    """
+    dedupe_members Filters out members whose content was already seen, files are only hashed
+    when another file of the same size exists so most members are never read twice
+
+    Args:
+        members (Iterable[ArchiveMember]): Members to filter
+        duplicates (dict[str, dict]): Filled in with skipped members, keyed by name in the
+            archive, with the name of the stored copy and the duplicate's own mtime and mode
+
+    Yields:
+        ArchiveMember: Members with distinct content, first copy wins
+    """
+    by_size: dict[int, list[ArchiveMember]] = {}
+    hashes: dict[str, str] = {}
+    for member in members:
+        if member.size < DEDUPE_MIN_SIZE:
+            yield member
+            continue
+        same_size = by_size.setdefault(member.size, [])
+        original = None
+        if same_size:
+            content_hash = hash_file(member.path, b'')
+            for seen in same_size:
+                if seen.arcname not in hashes:
+                    hashes[seen.arcname] = hash_file(seen.path, b'')
+                if hashes[seen.arcname]==content_hash:
+                    original = seen
+                    break
+            hashes[member.arcname] = content_hash
+        if original is None:
+            same_size.append(member)
+            yield member
+        else:
+            print(f"{member.arcname} duplicates {original.arcname}, storing once")
+            duplicates[member.arcname] = {'source': original.arcname, 'mtime': member.mtime,
+                'mode': member.mode}
+
+def duplicates_manifest(duplicates: dict[str, dict]) -> str:
+    """
+    duplicates_manifest Serializes duplicates the way they're stored in the archive
+
+    Args:
+        duplicates (dict[str, dict]): Duplicates recorded by `dedupe_members`
+
+    Returns:
+        str: Manifest JSON
+    """
+    return json.dumps({'version': DUPLICATES_VERSION, 'duplicates': duplicates}, indent=2)
+
+def write_duplicates(zip_ref: pyzipper.AESZipFile, duplicates: dict[str, dict]) -> None:
+    """
+    write_duplicates Adds the duplicates manifest to the archive, encrypted like any other member
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Encrypted zip file reference opened for writing
+        duplicates (dict[str, dict]): Duplicates recorded by `dedupe_members`
+    """
+    if not duplicates:
+        return
+    zip_ref.writestr(DUPLICATES_NAME, duplicates_manifest(duplicates))
+
+def restore_duplicates(dest_dir: Path, duplicates: dict[str, dict]) -> list[Path]:
+    """
+    restore_duplicates Recreates duplicates from their stored copy after extraction
+
+    Args:
+        dest_dir (Path): Directory the archive was extracted into
+        duplicates (dict[str, dict]): Duplicates recorded by `dedupe_members`
+
+    Raises:
+        ValueError: If a recorded path would land outside of the destination
+
+    Returns:
+        list[Path]: Paths of recreated files
+    """
+    dest_dir = dest_dir.resolve()
+    restored = []
+    for arcname, info in duplicates.items():
+        target = dest_dir.joinpath(arcname).resolve()
+        source = dest_dir.joinpath(info['source']).resolve()
+        if not target.is_relative_to(dest_dir) or not source.is_relative_to(dest_dir):
+            raise ValueError(f"Duplicate entry {arcname} points outside of {dest_dir}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, target)
+        os.chmod(target, info['mode'] & 0o7777)
+        os.utime(target, (info['mtime'], info['mtime']))
+        restored.append(target)
+    return restored
@@ -0,0 +1,137 @@
+"""extract.py
+
+Contains the functions for extracting solution zips created by solution zipper, handles the
+extra bookkeeping members such as recreating de-duplicated files
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['extract_zip']
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pyzipper
+
+from .archive import CHUNK_SIZE
+from .dedupe import DUPLICATES_NAME, restore_duplicates
+from .solid import SOLID_NAME, extract_solid
+from .volumes import INDEX_SUFFIX, load_index
+
+def _extract_duplicate(zip_ref: pyzipper.AESZipFile, dest_dir: Path, arcname: str,
+        info: dict) -> Path:
+    """
+    _extract_duplicate Writes a duplicate straight from its stored copy in the zip, for when the
+    stored copy itself wasn't asked for
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Zip file reference with password set
+        dest_dir (Path): Directory to extract into
+        arcname (str): Name of the duplicate in the archive
+        info (dict): Duplicate entry recorded by `dedupe_members`
+
+    Raises:
+        ValueError: If the duplicate would land outside of the destination
+
+    Returns:
+        Path: Path of the recreated file
+    """
+    dest_dir = dest_dir.resolve()
+    target = dest_dir.joinpath(arcname).resolve()
+    if not target.is_relative_to(dest_dir):
+        raise ValueError(f"Duplicate entry {arcname} points outside of {dest_dir}")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with zip_ref.open(info['source']) as src_ref, target.open('wb') as dst_ref:
+        shutil.copyfileobj(src_ref, dst_ref, CHUNK_SIZE)
+    os.chmod(target, info['mode'] & 0o7777)
+    os.utime(target, (info['mtime'], info['mtime']))
+    return target
+
+def _extract_volumes(index_path: Path, password: str, dest_dir: Path,
+        members: list[str]|None) -> list[Path]:
+    """
+    _extract_volumes Extracts the volumes listed in an index, only volumes holding a requested
+    member are opened
+
+    Args:
+        index_path (Path): Path to volume index
+        password (str): Password of the volumes
+        dest_dir (Path): Directory to extract into
+        members (list[str] | None): Names in the volumes to extract, None for everything
+
+    Raises:
+        KeyError: If a requested member isn't in any volume
+
+    Returns:
+        list[Path]: Paths of extracted files
+    """
+    volumes = load_index(index_path)
+    if members is not None:
+        indexed = {name for names in volumes.values() for name in names}
+        unknown = [name for name in members if name not in indexed]
+        if unknown:
+            raise KeyError(f"Not found in {index_path.name}: {', '.join(unknown)}")
+    extracted = []
+    for volume_name, names in volumes.items():
+        wanted = None if members is None else [name for name in members if name in names]
+        if wanted is None or wanted:
+            extracted.extend(extract_zip(index_path.with_name(volume_name), password, dest_dir,
+                wanted))
+    return extracted
+
+def extract_zip(zip_path: Path, password: str, dest_dir: Path=None,
+        members: list[str]=None) -> list[Path]:
+    """
+    extract_zip Extracts a solution zip, recreating any files that were stored once as
+    duplicates of another file. Only the members asked for are decrypted, except for solid zips
+    where the single tar entry is always decrypted in full. A volume index extracts its volumes
+
+    Args:
+        zip_path (Path): Path to solution zip or volume index
+        password (str): Password of the zip
+        dest_dir (Path, optional): Directory to extract into. Defaults to zip's directory.
+        members (list[str], optional): Names in the archive to extract. Defaults to all.
+
+    Raises:
+        FileNotFoundError: If zip isn't found
+        KeyError: If a requested member isn't in the zip
+
+    Returns:
+        list[Path]: Paths of extracted files
+    """
+    if not zip_path.is_file():
+        raise FileNotFoundError(f"Solution zip not found {zip_path}")
+    if dest_dir is None:
+        dest_dir = zip_path.parent
+    if zip_path.name.endswith(INDEX_SUFFIX):
+        return _extract_volumes(zip_path, password, dest_dir, members)
+    print(f"Extracting {zip_path.name} to {dest_dir}")
+    with pyzipper.AESZipFile(zip_path) as zip_ref:
+        zip_ref.setpassword(password.encode('ascii'))
+        duplicates = {}
+        if DUPLICATES_NAME in zip_ref.NameToInfo:
+            duplicates = json.loads(zip_ref.read(DUPLICATES_NAME))['duplicates']
+        if SOLID_NAME in zip_ref.NameToInfo:
+            return extract_solid(zip_ref, dest_dir, members)
+        if members is None:
+            names = [name for name in zip_ref.namelist() if name!=DUPLICATES_NAME]
+        else:
+            unknown = [name for name in members if name==DUPLICATES_NAME \
+                or (name not in zip_ref.NameToInfo and name not in duplicates)]
+            if unknown:
+                raise KeyError(f"Not found in {zip_path.name}: {', '.join(unknown)}")
+            names = [name for name in members if name in zip_ref.NameToInfo]
+            duplicates = {name: duplicates[name] for name in members if name in duplicates}
+        extracted = [Path(zip_ref.extract(name, dest_dir)) for name in names]
+        # Copies on disk are cheaper than decrypting again, unless the copy wasn't extracted
+        unextracted = {name: info for name, info in duplicates.items()
+            if info['source'] not in names}
+        extracted.extend(_extract_duplicate(zip_ref, dest_dir, name, info)
+            for name, info in unextracted.items())
+    duplicates = {name: info for name, info in duplicates.items() if name not in unextracted}
+    if duplicates:
+        print(f"Recreating {len(duplicates)} duplicate files")
+        extracted.extend(restore_duplicates(dest_dir, duplicates))
+    return extracted
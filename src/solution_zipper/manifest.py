@@ -0,0 +1,117 @@
+"""manifest.py
+
+Contains the per-solution manifest cache used for incremental re-zips, records each member's
+size, mtime and content hash so unchanged members can be carried over without re-encoding
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['content_hasher', 'get_manifest_path', 'hash_file', 'load_manifest', 'password_key',
+    'save_manifest']
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1048576 # 1MB
+
+def get_manifest_path(zip_path: Path) -> Path:
+    """
+    get_manifest_path Location of the manifest kept next to a solution zip
+
+    Args:
+        zip_path (Path): Path of the solution zip
+
+    Returns:
+        Path: Path of the manifest for the zip
+    """
+    return zip_path.with_name(f'{zip_path.name}.manifest.json')
+
+def password_key(password: str) -> bytes:
+    """
+    password_key Key for content hashes, hashes are keyed with the zip password so a manifest
+    left next to a public zip doesn't allow guessing the contents of small files
+
+    Args:
+        password (str): Password of the zip
+
+    Returns:
+        bytes: Key to use with `hash_file`
+    """
+    return hashlib.sha256(password.encode('utf-8')).digest()
+
+def content_hasher(key: bytes) -> hashlib.blake2b:
+    """
+    content_hasher New keyed hasher, for hashing contents while they are read for something else
+
+    Args:
+        key (bytes): Key from `password_key`
+
+    Returns:
+        hashlib.blake2b: Hasher giving the same digest as `hash_file`
+    """
+    return hashlib.blake2b(key=key)
+
+def hash_file(f_path: Path, key: bytes) -> str:
+    """
+    hash_file Keyed content hash of a file
+
+    Args:
+        f_path (Path): Path of file to hash
+        key (bytes): Key from `password_key`
+
+    Returns:
+        str: Hex digest of file contents
+    """
+    hasher = content_hasher(key)
+    with f_path.open('rb') as file_ref:
+        while chunk := file_ref.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def load_manifest(manifest_path: Path) -> dict[str, dict]:
+    """
+    load_manifest Loads members recorded in a manifest, a missing or unreadable manifest is
+    treated as empty so the next update just re-encodes everything
+
+    Args:
+        manifest_path (Path): Path of manifest
+
+    Returns:
+        dict[str, dict]: Member entries, keyed by name in the archive
+    """
+    if not manifest_path.is_file():
+        return {}
+    try:
+        with manifest_path.open('r', encoding='utf-8') as manifest_ref:
+            manifest = json.load(manifest_ref)
+    except (OSError, ValueError):
+        print(f"Unable to read manifest {manifest_path}, re-encoding all files")
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version')!=MANIFEST_VERSION:
+        print(f"Unknown manifest format in {manifest_path}, re-encoding all files")
+        return {}
+    return manifest.get('members', {})
+
+def save_manifest(manifest_path: Path, members: dict[str, dict]) -> None:
+    """
+    save_manifest Writes manifest atomically, temp file in the same directory is renamed over
+    the previous version
+
+    Args:
+        manifest_path (Path): Path of manifest
+        members (dict[str, dict]): Member entries, keyed by name in the archive
+    """
+    manifest = {'version': MANIFEST_VERSION, 'members': members}
+    tmp_fd, tmp_name = tempfile.mkstemp(prefix=f'.{manifest_path.name}.',
+        dir=manifest_path.parent)
+    try:
+        with os.fdopen(tmp_fd, 'w', encoding='utf-8') as manifest_ref:
+            json.dump(manifest, manifest_ref, indent=2)
+        os.replace(tmp_name, manifest_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
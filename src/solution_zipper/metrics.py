@@ -0,0 +1,181 @@
+"""metrics.py
+
+Contains the metrics collector for zip and git phases, records per-member sizes and compression and
+encryption times along with phase durations, passing each event to hooks as it's recorded
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['MetricsCollector', 'format_report']
+
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+
+METRICS_VERSION = 1
+
+class MetricsCollector:
+    """
+    Thread safe collector of zip and git metrics, hooks are called with each event dict in the
+    thread that recorded it, so they should be quick
+    """
+
+    def __init__(self, hooks: Iterable[Callable[[dict], None]]=None):
+        self.hooks: list[Callable[[dict], None]] = list(hooks or [])
+        self._lock = threading.Lock()
+        self._phases: list[dict] = []
+        self._members: list[dict] = []
+
+    def _record(self, records: list[dict], event: dict) -> None:
+        with self._lock:
+            records.append(event)
+        for hook in self.hooks:
+            hook(event)
+
+    def record_phase(self, phase: str, seconds: float, **fields) -> None:
+        """
+        record_phase Records the duration of a phase such as walking or a git push
+
+        Args:
+            phase (str): Name of the phase
+            seconds (float): Duration of the phase
+            **fields: Extra details, such as the repo the phase ran against
+        """
+        self._record(self._phases, {'kind': 'phase', 'phase': phase, 'seconds': seconds,
+            **fields})
+
+    def record_member(self, name: str, bytes_in: int, bytes_out: int, codec: str,
+            compress_seconds: float=0.0, encrypt_seconds: float=0.0) -> None:
+        """
+        record_member Records a member written to an archive
+
+        Args:
+            name (str): Name of the member in the archive
+            bytes_in (int): Uncompressed size
+            bytes_out (int): Size stored in the archive, including encryption overhead
+            codec (str): Description of the codec decision
+            compress_seconds (float, optional): Time spent compressing. Defaults to 0.
+            encrypt_seconds (float, optional): Time spent encrypting. Defaults to 0.
+        """
+        self._record(self._members, {'kind': 'member', 'name': name, 'bytes_in': bytes_in,
+            'bytes_out': bytes_out, 'codec': codec, 'compress_seconds': compress_seconds,
+            'encrypt_seconds': encrypt_seconds})
+
+    @contextmanager
+    def timer(self, phase: str, **fields) -> Iterator[None]:
+        """
+        timer Times the body of a with block as a phase, recorded even if it raises
+
+        Args:
+            phase (str): Name of the phase
+            **fields: Extra details, such as the repo the phase ran against
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(phase, time.perf_counter() - start, **fields)
+
+    def timed_iter(self, phase: str, items: Iterable, **fields) -> Iterator:
+        """
+        timed_iter Passes items through, timing only the work done producing them such as
+        walking a directory lazily, time consumers spend in between isn't counted
+
+        Args:
+            phase (str): Name of the phase
+            items (Iterable): Items to pass through
+            **fields: Extra details for the phase
+
+        Yields:
+            Items as they are produced
+        """
+        seconds = 0.0
+        iterator = iter(items)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - start
+                yield item
+        finally:
+            self.record_phase(phase, seconds, **fields)
+
+    def merge(self, report: dict) -> None:
+        """
+        merge Adds the events of a report from another collector, such as one from a worker
+        process, hooks are called for each of them
+
+        Args:
+            report (dict): Report created by `report`
+        """
+        for event in report['phases']:
+            self._record(self._phases, event)
+        for event in report['members']:
+            self._record(self._members, event)
+
+    def report(self) -> dict:
+        """
+        report Creates a JSON serializable report of everything recorded
+
+        Returns:
+            dict: Raw phase and member events along with totals
+        """
+        with self._lock:
+            phases = list(self._phases)
+            members = list(self._members)
+        totals: dict[str, dict] = {}
+        for event in phases:
+            phase_total = totals.setdefault(event['phase'], {'count': 0, 'seconds': 0.0})
+            phase_total['count'] += 1
+            phase_total['seconds'] += event['seconds']
+        return {
+            'version': METRICS_VERSION,
+            'phase_totals': totals,
+            'member_totals': {
+                'count': len(members),
+                'bytes_in': sum(member['bytes_in'] for member in members),
+                'bytes_out': sum(member['bytes_out'] for member in members),
+                'compress_seconds': sum(member['compress_seconds'] for member in members),
+                'encrypt_seconds': sum(member['encrypt_seconds'] for member in members),
+            },
+            'phases': phases,
+            'members': members,
+        }
+
+def format_report(report: dict, top: int=10) -> str:
+    """
+    format_report Renders a report as a readable profile, phases by total time and the members
+    that took longest to encode
+
+    Args:
+        report (dict): Report created by `MetricsCollector.report`
+        top (int, optional): Number of slowest members to list. Defaults to 10.
+
+    Returns:
+        str: Profile text
+    """
+    lines = [f"{'phase':<24}{'count':>7}{'seconds':>10}"]
+    for phase, phase_total in sorted(report['phase_totals'].items(),
+            key=lambda item: item[1]['seconds'], reverse=True):
+        lines.append(f"{phase:<24}{phase_total['count']:>7}{phase_total['seconds']:>10.3f}")
+    member_totals = report['member_totals']
+    ratio = member_totals['bytes_out'] / member_totals['bytes_in'] \
+        if member_totals['bytes_in'] else 0.0
+    lines.append(f"{member_totals['count']} members, {member_totals['bytes_in']} bytes in, "\
+        + f"{member_totals['bytes_out']} bytes out ({ratio:.3f}), "\
+        + f"{member_totals['compress_seconds']:.3f}s compressing, "\
+        + f"{member_totals['encrypt_seconds']:.3f}s encrypting")
+    slowest = sorted(report['members'], reverse=True,
+        key=lambda member: member['compress_seconds'] + member['encrypt_seconds'])[:top]
+    if slowest:
+        lines.append(f"{'slowest members':<48}{'bytes in':>12}{'compress':>10}{'encrypt':>10}")
+        for member in slowest:
+            lines.append(f"{member['name'][-47:]:<48}{member['bytes_in']:>12}"\
+                + f"{member['compress_seconds']:>10.3f}{member['encrypt_seconds']:>10.3f}  "\
+                + member['codec'])
+    return '\n'.join(lines)
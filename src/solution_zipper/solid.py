@@ -0,0 +1,119 @@
+"""solid.py
+
+Contains the solid archive mode, the solution tree is streamed as one tar inside a single
+encrypted zip entry so small files share one key derivation, one HMAC and one compression stream
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['SOLID_NAME', 'extract_solid', 'solid_member_size', 'write_solid']
+
+import tarfile
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+import pyzipper
+from pyzipper.zipfile import ZIP64_LIMIT
+from pyzipper.zipfile_aes import AESZipInfo
+
+from .archive import CHUNK_SIZE, ArchiveMember
+from .compression import COMPRESSION_NAMES, get_compressor
+from .metrics import MetricsCollector
+
+SOLID_NAME = '.solution_zipper/solid.tar'
+
+def _member_tarinfo(member: ArchiveMember) -> tarfile.TarInfo:
+    """Tar header of a member, the float mtime is kept exactly in a pax header"""
+    tarinfo = tarfile.TarInfo(member.arcname)
+    tarinfo.size = member.size
+    tarinfo.mtime = member.mtime
+    tarinfo.mode = member.mode & 0o7777
+    return tarinfo
+
+def solid_member_size(member: ArchiveMember) -> int:
+    """
+    solid_member_size Bytes a member takes up in the solid tar, its headers including any pax
+    header plus data padded to whole blocks
+
+    Args:
+        member (ArchiveMember): Member to size
+
+    Returns:
+        int: Bytes taken up in the tar before compression
+    """
+    header = _member_tarinfo(member).tobuf(tarfile.PAX_FORMAT)
+    return len(header) + -(-member.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+def write_solid(zip_ref: pyzipper.AESZipFile, members: Iterable[ArchiveMember],
+        metrics: MetricsCollector=None) -> dict[str, str]:
+    """
+    write_solid Streams members into a tar written as a single entry using the compression and
+    encryption settings of the zip file, compressing across file boundaries
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Encrypted zip file reference opened for writing
+        members (Iterable[ArchiveMember]): Members to add to the tar
+        metrics (MetricsCollector, optional): Collector recording the solid entry.
+            Defaults to None.
+
+    Returns:
+        dict[str, str]: Codec decision for each member, keyed by name in the tar
+    """
+    # Sizes are needed up front to know if the entry needs zip64 headers
+    members = list(members)
+    decision = f'solid, {COMPRESSION_NAMES[zip_ref.compression]}'
+    zinfo = AESZipInfo(SOLID_NAME, time.localtime()[0:6])
+    zinfo.compress_type = zip_ref.compression
+    zinfo._compresslevel = zip_ref.compresslevel # pylint: disable=protected-access
+    zinfo.external_attr = 0o600 << 16
+    tar_size = sum(solid_member_size(member) for member in members) + tarfile.RECORDSIZE
+    print(f"Adding {len(members)} files to zip as one solid entry ({decision})")
+    start = time.perf_counter()
+    with zip_ref.open(zinfo, 'w', force_zip64=tar_size * 1.05 > ZIP64_LIMIT) as dest_ref:
+        # pylint: disable=protected-access
+        # pyzipper's own compressor ignores LZMA levels, nothing is compressed yet to swap it
+        dest_ref._compressor = get_compressor(zinfo.compress_type, zinfo._compresslevel)
+        with tarfile.open(fileobj=dest_ref, mode='w|', format=tarfile.PAX_FORMAT,
+                bufsize=CHUNK_SIZE) as tar_ref:
+            for member in members:
+                with member.path.open('rb') as src_ref:
+                    tar_ref.addfile(_member_tarinfo(member), src_ref)
+    if metrics is not None:
+        # pyzipper compresses and encrypts inside write, the total is reported as compressing
+        metrics.record_member(SOLID_NAME, zinfo.file_size, zinfo.compress_size, decision,
+            time.perf_counter() - start)
+    return {member.arcname: decision for member in members}
+
+def extract_solid(zip_ref: pyzipper.AESZipFile, dest_dir: Path,
+        members: list[str]=None) -> list[Path]:
+    """
+    extract_solid Streams the solid entry's tar out to disk, the whole entry is decrypted even
+    when only some members are wanted as tar can't be read out of order
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Zip file reference with password set
+        dest_dir (Path): Directory to extract into
+        members (list[str], optional): Names in the tar to extract. Defaults to all.
+
+    Raises:
+        KeyError: If a requested member isn't in the tar
+
+    Returns:
+        list[Path]: Paths of extracted files
+    """
+    wanted = set(members) if members is not None else None
+    extracted = []
+    with zip_ref.open(SOLID_NAME) as src_ref, tarfile.open(fileobj=src_ref, mode='r|',
+            bufsize=CHUNK_SIZE) as tar_ref:
+        for tarinfo in tar_ref:
+            if wanted is not None and tarinfo.name not in wanted:
+                continue
+            # Data filter refuses absolute paths, links out of the destination and devices
+            tar_ref.extract(tarinfo, dest_dir, filter='data')
+            extracted.append(Path(dest_dir).joinpath(tarinfo.name))
+            if wanted is not None:
+                wanted.discard(tarinfo.name)
+    if wanted:
+        raise KeyError(f"Not found in solid entry: {', '.join(sorted(wanted))}")
+    return extracted
@@ -5,79 +5,443 @@ Contains the variables and functions for creating zips for solution files
 
 __author__ = "neo154"
 __version__ = '0.1.0'
-__all__ = ['create_zip_file']
+__all__ = ['ZipResult', 'create_zip_file', 'create_zip_files', 'find_solution_dirs',
+    'zip_solution']
 
+import glob
 import os
 import secrets
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, closing, nullcontext
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from multiprocessing import get_all_start_methods, get_context
 from pathlib import Path
+from typing import BinaryIO
 
 import pyzipper
 
+from .archive import ArchiveMember, CarriedMember, append_member, encode_members, write_members
+from .compression import check_compression
+from .dedupe import dedupe_members, write_duplicates
+from .manifest import get_manifest_path, hash_file, load_manifest, password_key, save_manifest
+from .metrics import MetricsCollector
+from .solid import write_solid
+from .volumes import (VOLUME_RESERVE, duplicate_costs, entry_cost, get_index_path, get_volume_path,
+    plan_volumes, write_index)
+from .walker import walk_solution
+
 DEFAULT_MAX_SIZE = 1073741824 # 1GB
 
-def _add_file(zip_ref: pyzipper.AESZipFile, f_path: Path, max_file_size: int,
-        exclude_files: list[str], parents: Path=None):
+@dataclass
+class ZipResult:
+    """Outcome of zipping a single solution directory"""
+    solution_dir: Path
+    zip_path: Path
+    password: str|None = None
+    error: str|None = None
+    codecs: dict[str, str] = field(default_factory=dict)
+    duplicates: dict[str, str] = field(default_factory=dict)
+    volumes: list[Path] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """Whether the solution was zipped without error"""
+        return self.error is None
+
+    @property
+    def paths(self) -> list[Path]:
+        """Every file written, the volumes and their index or just the zip"""
+        return [*self.volumes, self.zip_path]
+
+def _open_zip(zip_path: Path|BinaryIO, password: str, compression: int,
+        compresslevel: int|None) -> pyzipper.AESZipFile:
     """
-    _add_file Handler for adding file or directory and all subfiles to `AESZipFile` object
+    _open_zip Opens a new AES encrypted zip for writing
 
     Args:
-        zip_ref (pyzipper.AESZipFile): Encrypted zip file reference
-        f_path (Path): Path of file to add
-        max_file_size (int): Max file size that will be compressed in bytes
-        exclude_files (list[str]): List of file names, can be dir name, to not add/ignore
-        parents (Path, optional): Parent path, just for recursive call. Defaults to None.
+        zip_path (Path | BinaryIO): Path of zip to create or writable file-like object, which is
+            left open when the zip is closed
+        password (str): Password to encrypt with
+        compression (int): Zip compression type for members
+        compresslevel (int | None): Compression level, None for codec default
 
-    Raises:
-        ValueError: If file found isn't a directory or normal file
-    """
-    if parents is None:
-        parents = Path()
-    file_stat = f_path.stat()
-    if f_path.name in exclude_files:
-        print(f"{f_path.name} is in exclude file names list, ignoring for zip")
-        return
-    if f_path.is_file():
-        if file_stat.st_size < DEFAULT_MAX_SIZE:
-            tmp_ref = parents.joinpath(f_path.name)
-            print(f"Adding {tmp_ref} to zip")
-            zip_ref.write(tmp_ref)
+    Returns:
+        pyzipper.AESZipFile: Zip file reference opened for writing
+    """
+    zip_ref = pyzipper.AESZipFile(zip_path, 'w', compression=compression,
+        compresslevel=compresslevel, encryption=pyzipper.WZ_AES)
+    zip_ref.setpassword(password.encode('ascii'))
+    return zip_ref
+
+def _plan_update(members: Iterable[ArchiveMember], old_ref: pyzipper.AESZipFile|None,
+        raw_ref: BinaryIO|None, old_entries: dict[str, dict], new_entries: dict[str, dict],
+        key: bytes) -> Iterator[ArchiveMember|CarriedMember]:
+    """
+    _plan_update Decides per member whether the previous zip's entry can be carried over, members
+    with the same size and mtime as the manifest are trusted, others are hashed
+
+    Args:
+        members (Iterable[ArchiveMember]): Members currently in the solution directory
+        old_ref (pyzipper.AESZipFile | None): Previous zip, None if there isn't one
+        raw_ref (BinaryIO | None): Raw file object of previous zip for copying entries
+        old_entries (dict[str, dict]): Manifest entries of previous zip
+        new_entries (dict[str, dict]): Manifest entries for new zip, filled in while planning
+        key (bytes): Key for content hashes
+
+    Yields:
+        ArchiveMember | CarriedMember: Members to re-encode or carry over
+    """
+    for member in members:
+        old_info = old_ref.NameToInfo.get(member.arcname) if old_ref is not None else None
+        old_entry = old_entries.get(member.arcname)
+        if old_info is None or old_entry is None:
+            content_hash = hash_file(member.path, key)
+        elif old_entry['size']==member.size and old_entry['mtime']==member.mtime:
+            content_hash = old_entry['hash']
+        else:
+            content_hash = hash_file(member.path, key)
+        new_entries[member.arcname] = {'size': member.size, 'mtime': member.mtime,
+            'hash': content_hash}
+        if old_info is not None and old_entry is not None and old_entry['hash']==content_hash \
+                and not old_info.use_datadescripter:
+            yield CarriedMember(raw_ref, old_info)
         else:
-            print(f"{f_path} was larger than {max_file_size} bytes, not adding to zip")
-    elif f_path.is_dir():
-        for sub_path in f_path.iterdir():
-            _add_file(zip_ref, sub_path, max_file_size, exclude_files,
-                parents.joinpath(f_path.name))
-    else:
-        raise ValueError(f'{f_path} not a file or directory')
+            yield member
 
-def create_zip_file(solution_dir: Path, password: str=None, exclude_files: list[str]=None,
-        max_file_size: int=DEFAULT_MAX_SIZE) -> str:
+def _update_zip_file(zip_path: Path, password: str, members: Iterable[ArchiveMember],
+        workers: int, duplicates: dict[str, dict], compression: int,
+        compresslevel: int|None, metrics: MetricsCollector|None) -> dict[str, str]:
     """
-    create_zip_file Provided some directory containing a solultion, will create an encrypted zip
-    file containing all components in solution, and returning password for storage
+    _update_zip_file Re-zips a solution using the manifest next to the zip, only changed members
+    are re-compressed and re-encrypted, unchanged ones are copied byte-for-byte and deleted
+    ones dropped. New zip is built in a temp file and renamed over the previous one
 
-    Not intended for any high end security, just trying to make sure that the GitHub zips that
-    contain spoilers are protected but can be opened by intended people/groups
+    Args:
+        zip_path (Path): Path to solution zip, doesn't need to exist yet
+        password (str): Password of the existing zip
+        members (Iterable[ArchiveMember]): Members currently in the solution directory
+        workers (int): Number of threads compressing and encrypting members
+        duplicates (dict[str, dict]): Duplicates skipped while walking, complete once members
+            are exhausted
+        compression (int): Zip compression type for re-encoded members
+        compresslevel (int | None): Compression level, None for codec default
+        metrics (MetricsCollector | None): Collector recording each member
+
+    Raises:
+        ValueError: If password doesn't match the existing zip
+
+    Returns:
+        dict[str, str]: Codec decision for each member, keyed by name in the archive
+    """
+    manifest_path = get_manifest_path(zip_path)
+    old_entries = load_manifest(manifest_path)
+    new_entries: dict[str, dict] = {}
+    tmp_path = zip_path.with_name(f'.{zip_path.name}.partial')
+    try:
+        with ExitStack() as stack:
+            old_ref = raw_ref = None
+            if zip_path.exists():
+                old_ref = stack.enter_context(pyzipper.AESZipFile(zip_path))
+                old_ref.setpassword(password.encode('ascii'))
+                if old_ref.filelist:
+                    try:
+                        # Only reads the encryption header, enough to check the password
+                        old_ref.open(old_ref.filelist[0]).close()
+                    except RuntimeError as pass_err:
+                        raise ValueError(
+                            f"Password doesn't match existing zip {zip_path}") from pass_err
+                raw_ref = stack.enter_context(zip_path.open('rb'))
+            zip_ref = stack.enter_context(_open_zip(tmp_path, password, compression,
+                compresslevel))
+            codecs = write_members(zip_ref, _plan_update(members, old_ref, raw_ref,
+                old_entries, new_entries, password_key(password)), workers, metrics)
+            write_duplicates(zip_ref, duplicates)
+        os.replace(tmp_path, zip_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    save_manifest(manifest_path, new_entries)
+    return codecs
+
+def _volume_tmp_path(solution_dir: Path, number: int) -> Path:
+    """Volumes are built under temp names, final names are padded to the number of volumes"""
+    return solution_dir.parent.joinpath(f'.{solution_dir.name}.part{number}.zip.partial')
+
+def _close_volume(zip_ref: pyzipper.AESZipFile, names: list[str],
+        duplicates: dict[str, dict]) -> list[str]:
+    """
+    _close_volume Finishes a volume, duplicates go with their stored copy so every volume
+    extracts on its own
+
+    Args:
+        zip_ref (pyzipper.AESZipFile): Volume opened for writing
+        names (list[str]): Names of members in the volume
+        duplicates (dict[str, dict]): Duplicates of the whole solution
+
+    Returns:
+        list[str]: Names of the duplicates recorded in the volume
+    """
+    stored = set(names)
+    volume_duplicates = {name: info for name, info in duplicates.items()
+        if info['source'] in stored}
+    write_duplicates(zip_ref, volume_duplicates)
+    zip_ref.close()
+    return list(volume_duplicates)
+
+def _write_packed_volumes(solution_dir: Path, password: str, members: list[ArchiveMember],
+        volume_size: int, workers: int|None, duplicates: dict[str, dict], compression: int,
+        compresslevel: int|None, metrics: MetricsCollector|None,
+        tmp_paths: list[Path]) -> tuple[list[list[str]], dict[str, str]]:
+    """
+    _write_packed_volumes Encodes members on one thread pool across volume boundaries and places
+    each by its final size, a new volume starts when the next member won't fit
+
+    Args:
+        solution_dir (Path): Path to solution directory
+        password (str): Password to encrypt every volume with
+        members (list[ArchiveMember]): Members to add
+        volume_size (int): Max size of a volume in bytes
+        workers (int | None): Number of threads compressing and encrypting, None for CPU count
+        duplicates (dict[str, dict]): Duplicates of the whole solution
+        compression (int): Zip compression type for members
+        compresslevel (int | None): Compression level, None for codec default
+        metrics (MetricsCollector | None): Collector recording each member
+        tmp_paths (list[Path]): Filled in with the temp path of each volume as it's opened
+
+    Raises:
+        ValueError: If a member can't fit in a volume on its own
+
+    Returns:
+        tuple[list[list[str]], dict[str, str]]: Names in each volume and codec decision for each
+            member
+    """
+    dup_costs = duplicate_costs(duplicates)
+    volumes: list[list[str]] = [[]]
+    codecs: dict[str, str] = {}
+    tmp_paths.append(_volume_tmp_path(solution_dir, 1))
+    # First volume's settings drive the encoders, every volume shares them and the password
+    zip_ref = _open_zip(tmp_paths[-1], password, compression, compresslevel)
+    used = VOLUME_RESERVE
+    try:
+        with closing(encode_members(zip_ref, members, workers)) as encoded:
+            for item in encoded:
+                cost = entry_cost(item.zinfo.filename, item.zinfo.compress_size) \
+                    + dup_costs.get(item.zinfo.filename, 0)
+                if cost + VOLUME_RESERVE > volume_size:
+                    raise ValueError(f"{item.zinfo.filename} needs {cost} bytes once encoded, "\
+                        + f"can't fit in a volume of {volume_size} bytes")
+                if volumes[-1] and used + cost > volume_size:
+                    volumes[-1].extend(_close_volume(zip_ref, volumes[-1], duplicates))
+                    tmp_paths.append(_volume_tmp_path(solution_dir, len(tmp_paths) + 1))
+                    zip_ref = _open_zip(tmp_paths[-1], password, compression, compresslevel)
+                    volumes.append([])
+                    used = VOLUME_RESERVE
+                name, codecs[name] = append_member(zip_ref, item, metrics)
+                volumes[-1].append(name)
+                used += cost
+        volumes[-1].extend(_close_volume(zip_ref, volumes[-1], duplicates))
+    except BaseException:
+        zip_ref.close()
+        raise
+    return volumes, codecs
+
+def _write_solid_volume(volume_path: Path, password: str, members: list[ArchiveMember],
+        duplicates: dict[str, dict], compression: int, compresslevel: int|None,
+        metrics: MetricsCollector|None) -> tuple[list[str], dict[str, str]]:
+    """
+    _write_solid_volume Thread pool target, writes one planned volume as a solid entry
+
+    Args:
+        volume_path (Path): Path of volume to create
+        password (str): Password to encrypt with
+        members (list[ArchiveMember]): Members of the volume
+        duplicates (dict[str, dict]): Duplicates of the whole solution
+        compression (int): Zip compression type
+        compresslevel (int | None): Compression level, None for codec default
+        metrics (MetricsCollector | None): Collector recording the solid entry
+
+    Returns:
+        tuple[list[str], dict[str, str]]: Names in the volume and codec decision for each member
+    """
+    zip_ref = _open_zip(volume_path, password, compression, compresslevel)
+    try:
+        codecs = write_solid(zip_ref, members, metrics)
+    except BaseException:
+        zip_ref.close()
+        raise
+    names = [member.arcname for member in members]
+    return names + _close_volume(zip_ref, names, duplicates), codecs
+
+def _write_solid_volumes(solution_dir: Path, password: str, members: list[ArchiveMember],
+        volume_size: int, workers: int|None, duplicates: dict[str, dict], compression: int,
+        compresslevel: int|None, metrics: MetricsCollector|None,
+        tmp_paths: list[Path]) -> tuple[list[list[str]], dict[str, str]]:
+    """
+    _write_solid_volumes Solid volumes compress across files so sizes are only known once a
+    volume is done, members are planned into volumes up front and each volume is its own job on
+    a thread pool
+
+    Args:
+        solution_dir (Path): Path to solution directory
+        password (str): Password to encrypt every volume with
+        members (list[ArchiveMember]): Members to add
+        volume_size (int): Max size of a volume in bytes
+        workers (int | None): Number of volumes written at once, None for CPU count
+        duplicates (dict[str, dict]): Duplicates of the whole solution
+        compression (int): Zip compression type
+        compresslevel (int | None): Compression level, None for codec default
+        metrics (MetricsCollector | None): Collector recording each solid entry
+        tmp_paths (list[Path]): Filled in with the temp path of each volume
+
+    Raises:
+        ValueError: If a member can't fit in a volume on its own
+
+    Returns:
+        tuple[list[list[str]], dict[str, str]]: Names in each volume and codec decision for each
+            member
+    """
+    planned = plan_volumes(members, volume_size, duplicates) or [[]]
+    tmp_paths.extend(_volume_tmp_path(solution_dir, number)
+        for number in range(1, len(planned) + 1))
+    volumes: list[list[str]] = []
+    codecs: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=min(workers or os.cpu_count() or 1,
+            len(planned))) as executor:
+        futures = [executor.submit(_write_solid_volume, tmp_path, password, volume_members,
+                duplicates, compression, compresslevel, metrics)
+            for tmp_path, volume_members in zip(tmp_paths, planned)]
+        for future in futures:
+            names, volume_codecs = future.result()
+            volumes.append(names)
+            codecs.update(volume_codecs)
+    return volumes, codecs
+
+def _write_volumes(solution_dir: Path, password: str, members: Iterable[ArchiveMember],
+        volume_size: int, workers: int|None, duplicates: dict[str, dict], compression: int,
+        compresslevel: int|None, metrics: MetricsCollector|None,
+        solid: bool) -> tuple[list[Path], dict[str, str]]:
+    """
+    _write_volumes Splits a solution into size capped volumes, each a complete encrypted zip with
+    its own duplicates manifest. Volumes are renamed into place and the index written once all
+    of them are done, a failure removes every volume
+
+    Args:
+        solution_dir (Path): Path to solution directory
+        password (str): Password to encrypt every volume with
+        members (Iterable[ArchiveMember]): Members to add
+        volume_size (int): Max size of a volume in bytes
+        workers (int | None): Number of threads compressing and encrypting, None for CPU count
+        duplicates (dict[str, dict]): Duplicates skipped while walking, complete once members
+            are exhausted
+        compression (int): Zip compression type for members
+        compresslevel (int | None): Compression level, None for codec default
+        metrics (MetricsCollector | None): Collector recording each member
+        solid (bool): Store each volume's members as one tar in a single encrypted entry
+
+    Raises:
+        ValueError: If a member can't fit in a volume on its own
+
+    Returns:
+        tuple[list[Path], dict[str, str]]: Volume paths in order and codec decision for each member
+    """
+    # Duplicates have to be complete before the first volume is finished
+    members = list(members)
+    print(f"Creating volumes of at most {volume_size} bytes")
+    tmp_paths: list[Path] = []
+    volume_paths: list[Path] = []
+    try:
+        write_args = (solution_dir, password, members, volume_size, workers, duplicates,
+            compression, compresslevel, metrics, tmp_paths)
+        if solid:
+            volumes, codecs = _write_solid_volumes(*write_args)
+        else:
+            volumes, codecs = _write_packed_volumes(*write_args)
+        volume_paths = [get_volume_path(solution_dir, number, len(tmp_paths))
+            for number in range(1, len(tmp_paths) + 1)]
+        for tmp_path, volume_path in zip(tmp_paths, volume_paths):
+            os.replace(tmp_path, volume_path)
+        write_index(get_index_path(solution_dir), {volume_path.name: names
+            for volume_path, names in zip(volume_paths, volumes)})
+    except BaseException:
+        for volume_path in [*tmp_paths, *volume_paths]:
+            volume_path.unlink(missing_ok=True)
+        raise
+    print(f"Created {len(volume_paths)} volumes")
+    return volume_paths, codecs
+
+def zip_solution(solution_dir: Path, password: str=None, exclude_files: list[str]=None,
+        max_file_size: int=DEFAULT_MAX_SIZE, workers: int=None, update: bool=False,
+        use_gitignore: bool=False, dedupe: bool=False, compression: int=pyzipper.ZIP_DEFLATED,
+        compresslevel: int=None, metrics: MetricsCollector=None, solid: bool=False,
+        volume_size: int=None, target: BinaryIO=None) -> ZipResult:
+    """
+    zip_solution Same as `create_zip_file`, but returns the full result including the codec
+    chosen for each file, already compressed files are stored rather than deflated
 
     Args:
         solution_dir (Path): Path to solution directory
         password (str, optional): Password to encrypt, either flag for CTF/HTB.
             Default is None, creates it's own version used for things like leetCode.
-        exclude_files (list[Path], optional): List of file names to exclude. Defaults to None.
+        exclude_files (list[str], optional): List of file names or gitignore style patterns to
+            exclude. Defaults to None.
         max_file_size (int, optional): Max size of a file to be added to compressed file, in bytes.
             Defaults to 1GB.
+        workers (int, optional): Number of threads compressing and encrypting members.
+            Defaults to CPU count.
+        update (bool, optional): Update an existing zip in place, only re-encoding changed
+            files, using a manifest kept next to the zip. Defaults to False.
+        use_gitignore (bool, optional): Honor `.gitignore` files in the solution along with
+            `.solutionignore` ones. Defaults to False.
+        dedupe (bool, optional): Store files with identical content once, duplicates are
+            recreated by `extract_zip`. Defaults to False.
+        compression (int, optional): Zip compression type, stored, deflate, bzip2 or lzma.
+            Defaults to deflate.
+        compresslevel (int, optional): Compression level. Defaults to codec default.
+        metrics (MetricsCollector, optional): Collector for walk time and each member's sizes
+            and encoding times. Defaults to None.
+        solid (bool, optional): Store the tree as one tar in a single encrypted entry,
+            compressing across files, extract with `extract_zip`. Defaults to False.
+        volume_size (int, optional): Max size in bytes of each zip, splits the solution into
+            `<solution>.partNN.zip` volumes that decrypt on their own, listed in
+            `<solution>.index.json`. Defaults to a single zip.
+        target (BinaryIO, optional): Writable file-like object to write the zip to instead of
+            `<solution>.zip`, such as a spooled buffer staged straight into git. Left open once
+            the zip is done. Defaults to writing next to the solution.
 
     Raises:
-        FileExistsError: If solution related zipfile already exists
+        FileExistsError: If solution related zipfile already exists and not updating
         FileNotFoundError: If solution directory provided doesn't exist or can't be found
         NotADirectoryError: If path for solution isn't a directory
+        ValueError: If updating an existing zip without its password, compression level is
+            invalid, solid is combined with update or dedupe, volumes are combined with update,
+            volume size is too small, a file can't fit in a volume or a target is combined with
+            update or volumes
 
     Returns:
-        str: Password for decrypting zipfile
+        ZipResult: Zip path, password, codec decision for each file and skipped duplicates
     """
+    check_compression(compression, compresslevel)
+    if solid and (update or dedupe):
+        raise ValueError("Solid zips can't be updated or de-duplicated")
+    if volume_size is not None and update:
+        raise ValueError("Volumes can't be updated, remove them and zip again")
+    if volume_size is not None and volume_size <= VOLUME_RESERVE:
+        raise ValueError(f"Volume size needs to be more than {VOLUME_RESERVE} bytes, "\
+            + f"got {volume_size}")
+    if target is not None and (update or volume_size is not None):
+        raise ValueError("Only a new single zip can be written to a target")
     zip_path = solution_dir.parent.joinpath(f'{solution_dir.name}.zip')
-    if zip_path.exists():
+    if volume_size is not None:
+        zip_path = get_index_path(solution_dir)
+        if zip_path.exists() or any(solution_dir.parent.glob(
+                f'{glob.escape(solution_dir.name)}.part*.zip')):
+            raise FileExistsError(f"Cannot create more volumes in the same location {zip_path}")
+    if zip_path.exists() and not update and target is None:
         raise FileExistsError(f"Cannot create another zip file in the same location {zip_path}")
+    if zip_path.exists() and update and password is None:
+        raise ValueError(f"Password of existing zip is required to update it {zip_path}")
     if not solution_dir.exists():
         raise FileNotFoundError(f"Solution directory is not found {solution_dir}")
     if not solution_dir.is_dir():
@@ -85,13 +449,233 @@ def create_zip_file(solution_dir: Path, password: str=None, exclude_files: list[
     if password is None:
         # Safe enough here
         password = secrets.token_urlsafe(20)
+    if max_file_size is None:
+        max_file_size = DEFAULT_MAX_SIZE
+    members = walk_solution(solution_dir, max_file_size, exclude_files, use_gitignore)
+    if metrics is not None:
+        # Walk is lazy, only the time spent producing members counts
+        members = metrics.timed_iter('walk', members, solution=solution_dir.name)
+    duplicates: dict[str, dict] = {}
+    if dedupe:
+        members = dedupe_members(members, duplicates)
+    zip_timer = metrics.timer('zip', solution=solution_dir.name) if metrics is not None \
+        else nullcontext()
+    volume_paths: list[Path] = []
+    with zip_timer:
+        if volume_size is not None:
+            volume_paths, codecs = _write_volumes(solution_dir, password, members, volume_size,
+                workers, duplicates, compression, compresslevel, metrics, solid)
+        elif update:
+            print(f"Updating {zip_path.name}")
+            codecs = _update_zip_file(zip_path, password, members, workers, duplicates,
+                compression, compresslevel, metrics)
+        else:
+            print(f"Creating {zip_path.name}")
+            # Zips on disk get a manifest so the first update can already carry files over
+            entries = {} if target is None and not solid else None
+            try:
+                with _open_zip(zip_path if target is None else target, password, compression,
+                        compresslevel) as zip_ref:
+                    if solid:
+                        codecs = write_solid(zip_ref, members, metrics)
+                    else:
+                        codecs = write_members(zip_ref, members, workers, metrics, entries,
+                            password_key(password))
+                    write_duplicates(zip_ref, duplicates)
+            except BaseException:
+                # A partial zip would block the next run with FileExistsError, targets belong
+                # to the caller
+                if target is None:
+                    zip_path.unlink(missing_ok=True)
+                raise
+            if entries is not None:
+                save_manifest(get_manifest_path(zip_path), entries)
+    return ZipResult(solution_dir, zip_path, password, codecs=codecs,
+        duplicates={name: info['source'] for name, info in duplicates.items()},
+        volumes=volume_paths)
+
+def create_zip_file(solution_dir: Path, password: str=None, exclude_files: list[str]=None,
+        max_file_size: int=DEFAULT_MAX_SIZE, workers: int=None, update: bool=False,
+        use_gitignore: bool=False, dedupe: bool=False, compression: int=pyzipper.ZIP_DEFLATED,
+        compresslevel: int=None, metrics: MetricsCollector=None, solid: bool=False,
+        volume_size: int=None, target: BinaryIO=None) -> str:
+    """
+    create_zip_file Provided some directory containing a solultion, will create an encrypted zip
+    file containing all components in solution, and returning password for storage
+
+    Not intended for any high end security, just trying to make sure that the GitHub zips that
+    contain spoilers are protected but can be opened by intended people/groups
+
+    Args:
+        solution_dir (Path): Path to solution directory
+        password (str, optional): Password to encrypt, either flag for CTF/HTB.
+            Default is None, creates it's own version used for things like leetCode.
+        exclude_files (list[str], optional): List of file names or gitignore style patterns to
+            exclude. Defaults to None.
+        max_file_size (int, optional): Max size of a file to be added to compressed file, in bytes.
+            Defaults to 1GB.
+        workers (int, optional): Number of threads compressing and encrypting members.
+            Defaults to CPU count.
+        update (bool, optional): Update an existing zip in place, only re-encoding changed
+            files, using a manifest kept next to the zip. Defaults to False.
+        use_gitignore (bool, optional): Honor `.gitignore` files in the solution along with
+            `.solutionignore` ones. Defaults to False.
+        dedupe (bool, optional): Store files with identical content once, duplicates are
+            recreated by `extract_zip`. Defaults to False.
+        compression (int, optional): Zip compression type, stored, deflate, bzip2 or lzma.
+            Defaults to deflate.
+        compresslevel (int, optional): Compression level. Defaults to codec default.
+        metrics (MetricsCollector, optional): Collector for walk time and each member's sizes
+            and encoding times. Defaults to None.
+        solid (bool, optional): Store the tree as one tar in a single encrypted entry,
+            compressing across files, extract with `extract_zip`. Defaults to False.
+        volume_size (int, optional): Max size in bytes of each zip, splits the solution into
+            `<solution>.partNN.zip` volumes that decrypt on their own, listed in
+            `<solution>.index.json`. Defaults to a single zip.
+        target (BinaryIO, optional): Writable file-like object to write the zip to instead of
+            `<solution>.zip`, such as a spooled buffer staged straight into git. Left open once
+            the zip is done. Defaults to writing next to the solution.
+
+    Raises:
+        FileExistsError: If solution related zipfile already exists and not updating
+        FileNotFoundError: If solution directory provided doesn't exist or can't be found
+        NotADirectoryError: If path for solution isn't a directory
+        ValueError: If updating an existing zip without its password, compression level is
+            invalid, solid is combined with update or dedupe, volumes are combined with update,
+            volume size is too small, a file can't fit in a volume or a target is combined with
+            update or volumes
+
+    Returns:
+        str: Password for decrypting zipfile
+    """
+    return zip_solution(solution_dir, password, exclude_files, max_file_size, workers,
+        update, use_gitignore, dedupe, compression, compresslevel, metrics, solid,
+        volume_size, target).password
+
+def find_solution_dirs(root_dir: Path, exclude_files: list[str]=None) -> list[Path]:
+    """
+    find_solution_dirs Locates the solution directories in a challenge tree, every direct
+    sub-directory of the root is treated as one solution, hidden directories are ignored
+
+    Args:
+        root_dir (Path): Root of the challenge tree containing solution directories
+        exclude_files (list[str], optional): Directory names or glob patterns to skip.
+            Defaults to None.
+
+    Raises:
+        NotADirectoryError: If root provided isn't a directory
+
+    Returns:
+        list[Path]: Sorted list of solution directories
+    """
+    if not root_dir.is_dir():
+        raise NotADirectoryError(f"Batch root needs to be a directory: {root_dir}")
     if exclude_files is None:
         exclude_files = []
-    orig_dir = Path.cwd()
-    os.chdir(solution_dir.parent)
-    print(f"Creating {zip_path.name}")
-    with pyzipper.AESZipFile(zip_path, 'w', compression=pyzipper.ZIP_DEFLATED, encryption=pyzipper.WZ_AES) as zip_ref:
-        zip_ref.setpassword(password.encode('ascii'))
-        _add_file(zip_ref, solution_dir, max_file_size, exclude_files)
-    os.chdir(orig_dir)
-    return password
+    return sorted(sub_path for sub_path in root_dir.iterdir() if sub_path.is_dir() \
+        and not sub_path.name.startswith('.') \
+        and not any(fnmatch(sub_path.name, pattern) for pattern in exclude_files))
+
+def _zip_solution_worker(solution_dir: Path, password: str, exclude_files: list[str],
+        max_file_size: int, update: bool, use_gitignore: bool, dedupe: bool, compression: int,
+        compresslevel: int|None, collect_metrics: bool, solid: bool,
+        volume_size: int|None) -> tuple[ZipResult, dict|None]:
+    """
+    _zip_solution_worker Process pool target, zips one solution and captures any failure so a
+    bad directory doesn't stop the rest of the batch
+
+    Args:
+        solution_dir (Path): Path to solution directory
+        password (str): Password to encrypt with, None to generate one
+        exclude_files (list[str]): List of file names or patterns to exclude
+        max_file_size (int): Max size of a file to be added to compressed file, in bytes
+        update (bool): Update existing zip, only re-encoding changed files
+        use_gitignore (bool): Honor `.gitignore` files along with `.solutionignore` ones
+        dedupe (bool): Store files with identical content once
+        compression (int): Zip compression type
+        compresslevel (int | None): Compression level, None for codec default
+        collect_metrics (bool): Collect metrics, collectors don't cross processes so the report
+            is returned instead
+        solid (bool): Store the tree as one tar in a single encrypted entry
+        volume_size (int | None): Max size in bytes of each volume, None for a single zip
+
+    Returns:
+        tuple[ZipResult, dict | None]: Result for the solution directory and metrics report
+    """
+    metrics = MetricsCollector() if collect_metrics else None
+    try:
+        # Parallelism comes from the process pool, keep each zip single threaded
+        result = zip_solution(solution_dir, password, exclude_files, max_file_size, 1, update,
+            use_gitignore, dedupe, compression, compresslevel, metrics, solid, volume_size)
+    except Exception as zip_err: # pylint: disable=broad-exception-caught
+        zip_path = get_index_path(solution_dir) if volume_size is not None \
+            else solution_dir.parent.joinpath(f'{solution_dir.name}.zip')
+        result = ZipResult(solution_dir, zip_path, error=f'{type(zip_err).__name__}: {zip_err}')
+    return result, metrics.report() if metrics is not None else None
+
+def create_zip_files(solution_dirs: list[Path], password: str=None,
+        exclude_files: list[str]=None, max_file_size: int=DEFAULT_MAX_SIZE,
+        workers: int=None, update: bool=False, use_gitignore: bool=False,
+        dedupe: bool=False, compression: int=pyzipper.ZIP_DEFLATED,
+        compresslevel: int=None, metrics: MetricsCollector=None,
+        solid: bool=False, volume_size: int=None) -> dict[Path, ZipResult]:
+    """
+    create_zip_files Batch version of `create_zip_file`, zips many solution directories across a
+    process pool, each directory gets its own result so one failure doesn't stop the run
+
+    Args:
+        solution_dirs (list[Path]): Paths to solution directories
+        password (str, optional): Password used for every zip. Default is None, generating a
+            new one per solution.
+        exclude_files (list[str], optional): List of file names or patterns to exclude.
+            Defaults to None.
+        max_file_size (int, optional): Max size of a file to be added to compressed file, in bytes.
+            Defaults to 1GB.
+        workers (int, optional): Number of worker processes. Defaults to CPU count.
+        update (bool, optional): Update existing zips, only re-encoding changed files.
+            Defaults to False.
+        use_gitignore (bool, optional): Honor `.gitignore` files along with `.solutionignore`
+            ones. Defaults to False.
+        dedupe (bool, optional): Store files with identical content once. Defaults to False.
+        compression (int, optional): Zip compression type. Defaults to deflate.
+        compresslevel (int, optional): Compression level. Defaults to codec default.
+        metrics (MetricsCollector, optional): Collector the workers' metrics are merged into as
+            each solution finishes. Defaults to None.
+        solid (bool, optional): Store each tree as one tar in a single encrypted entry.
+            Defaults to False.
+        volume_size (int, optional): Max size in bytes of each zip, splitting solutions into
+            volumes. Defaults to a single zip per solution.
+
+    Raises:
+        ValueError: If number of workers isn't positive, compression level is invalid, solid
+            is combined with update or dedupe or volumes are combined with update
+
+    Returns:
+        dict[Path, ZipResult]: Results keyed by solution directory, in provided order
+    """
+    if workers is not None and workers < 1:
+        raise ValueError(f"Number of workers needs to be at least 1, got {workers}")
+    check_compression(compression, compresslevel)
+    if solid and (update or dedupe):
+        raise ValueError("Solid zips can't be updated or de-duplicated")
+    if volume_size is not None and update:
+        raise ValueError("Volumes can't be updated, remove them and zip again")
+    results: dict[Path, ZipResult] = {}
+    if not solution_dirs:
+        return results
+    workers = min(workers or os.cpu_count() or 1, len(solution_dirs))
+    print(f"Zipping {len(solution_dirs)} solutions with {workers} workers")
+    # Callers like zip_and_store_many run git threads alongside, forking those isn't safe
+    mp_context = get_context('forkserver') if 'forkserver' in get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+        futures = {
+            executor.submit(_zip_solution_worker, solution_dir, password, exclude_files,
+                max_file_size, update, use_gitignore, dedupe, compression,
+                compresslevel, metrics is not None, solid, volume_size): solution_dir
+            for solution_dir in solution_dirs
+        }
+        for future in as_completed(futures):
+            results[futures[future]], report = future.result()
+            if report is not None:
+                metrics.merge(report)
+    return {solution_dir: results[solution_dir] for solution_dir in solution_dirs}
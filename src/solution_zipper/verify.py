@@ -0,0 +1,98 @@
+"""verify.py
+
+Contains integrity checks for solution zips, every member is decrypted and checked against its
+CRC and AES authentication code while streaming so memory use doesn't depend on member size
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['VerifyResult', 'verify_zip', 'verify_zips']
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import get_all_start_methods, get_context
+from pathlib import Path
+
+import pyzipper
+
+from .archive import CHUNK_SIZE
+from .dedupe import DUPLICATES_NAME
+
+@dataclass
+class VerifyResult:
+    """Outcome of verifying a single solution zip"""
+    zip_path: Path
+    members: int = 0
+    bytes_checked: int = 0
+    error: str|None = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether every member decrypted and matched its checks"""
+        return self.error is None
+
+def verify_zip(zip_path: Path, password: str) -> VerifyResult:
+    """
+    verify_zip Decrypts every member of a solution zip, pyzipper checks the CRC and for AES the
+    HMAC once a member is read to the end, nothing is written to disk
+
+    Args:
+        zip_path (Path): Path to solution zip
+        password (str): Password of the zip
+
+    Returns:
+        VerifyResult: Members and bytes checked, with the first failure if there was one
+    """
+    result = VerifyResult(zip_path)
+    try:
+        with pyzipper.AESZipFile(zip_path) as zip_ref:
+            zip_ref.setpassword(password.encode('ascii'))
+            for zinfo in zip_ref.infolist():
+                with zip_ref.open(zinfo) as member_ref:
+                    while chunk := member_ref.read(CHUNK_SIZE):
+                        result.bytes_checked += len(chunk)
+                result.members += 1
+            if DUPLICATES_NAME in zip_ref.NameToInfo:
+                duplicates = json.loads(zip_ref.read(DUPLICATES_NAME))['duplicates']
+                missing = sorted({info['source'] for info in duplicates.values()} \
+                    - set(zip_ref.NameToInfo))
+                if missing:
+                    raise pyzipper.BadZipFile(
+                        f"Duplicates refer to members not in zip: {', '.join(missing)}")
+    except Exception as verify_err: # pylint: disable=broad-exception-caught
+        # Corruption surfaces as whatever the codec raises, such as LZMAError or zlib.error, and
+        # pyzipper reports a bad password as RuntimeError
+        result.error = f'{type(verify_err).__name__}: {verify_err}'
+    return result
+
+def verify_zips(zip_passwords: dict[Path, str], workers: int=None) -> dict[Path, VerifyResult]:
+    """
+    verify_zips Batch version of `verify_zip`, checks zips across a process pool, each worker
+    streams one zip at a time so memory per worker stays constant
+
+    Args:
+        zip_passwords (dict[Path, str]): Zip paths to their passwords
+        workers (int, optional): Number of worker processes. Defaults to CPU count.
+
+    Raises:
+        ValueError: If number of workers isn't positive
+
+    Returns:
+        dict[Path, VerifyResult]: Results keyed by zip path, in provided order
+    """
+    if workers is not None and workers < 1:
+        raise ValueError(f"Number of workers needs to be at least 1, got {workers}")
+    results: dict[Path, VerifyResult] = {}
+    if not zip_passwords:
+        return results
+    workers = min(workers or os.cpu_count() or 1, len(zip_passwords))
+    print(f"Verifying {len(zip_passwords)} zips with {workers} workers")
+    mp_context = get_context('forkserver') if 'forkserver' in get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+        futures = {executor.submit(verify_zip, zip_path, password): zip_path
+            for zip_path, password in zip_passwords.items()}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return {zip_path: results[zip_path] for zip_path in zip_passwords}
@@ -0,0 +1,156 @@
+"""volumes.py
+
+Contains the sizing for multi-volume output, members are packed into size capped volumes that
+each decrypt on their own, with an index listing which volume holds which file
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['INDEX_SUFFIX', 'VOLUME_RESERVE', 'duplicate_costs', 'entry_cost', 'get_index_path',
+    'get_volume_path', 'load_index', 'plan_volumes', 'write_index']
+
+import json
+from pathlib import Path
+
+from .archive import ArchiveMember
+from .config import write_json
+from .dedupe import duplicates_manifest
+from .solid import solid_member_size
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.index.json'
+# Worst case growth of incompressible data through deflate, bzip2 or lzma, solid entries are
+# never stored instead
+GROWTH_FACTOR = 1.01
+# Local header and central directory entry along with their AES and zip64 extra fields
+ENTRY_OVERHEAD = 128
+# End of central directory, zip64 records, tar end of archive blocks, the solid entry itself and
+# the duplicates manifest's entry
+VOLUME_RESERVE = 16384
+
+def get_index_path(solution_dir: Path) -> Path:
+    """
+    get_index_path Path of the volume index for a solution, kept next to the volumes
+
+    Args:
+        solution_dir (Path): Path to solution directory
+
+    Returns:
+        Path: Path of the volume index
+    """
+    return solution_dir.parent.joinpath(f'{solution_dir.name}{INDEX_SUFFIX}')
+
+def get_volume_path(solution_dir: Path, number: int, count: int) -> Path:
+    """
+    get_volume_path Path of a volume, numbers are zero padded so volumes sort in order
+
+    Args:
+        solution_dir (Path): Path to solution directory
+        number (int): Number of the volume, starting at 1
+        count (int): Total number of volumes
+
+    Returns:
+        Path: Path of the volume
+    """
+    width = max(2, len(str(count)))
+    return solution_dir.parent.joinpath(f'{solution_dir.name}.part{number:0{width}d}.zip')
+
+def entry_cost(arcname: str, compress_size: int) -> int:
+    """
+    entry_cost Bytes an encoded member takes up in a volume, the name is stored in both the local
+    header and the central directory
+
+    Args:
+        arcname (str): Name of the member in the archive
+        compress_size (int): Size of the compressed and encrypted data
+
+    Returns:
+        int: Bytes taken up in the volume
+    """
+    return compress_size + ENTRY_OVERHEAD + 2 * len(arcname.encode())
+
+def duplicate_costs(duplicates: dict[str, dict]) -> dict[str, int]:
+    """
+    duplicate_costs Bytes the duplicates manifest takes up for each stored copy, the manifest
+    entries of duplicates go in the same volume as their stored copy. Each copy's duplicates are
+    serialized as a manifest of their own, so the sum over a volume is never less than its
+    actual manifest
+
+    Args:
+        duplicates (dict[str, dict]): Duplicates recorded by `dedupe_members`
+
+    Returns:
+        dict[str, int]: Names of stored copies to the manifest bytes of their duplicates
+    """
+    by_source: dict[str, dict[str, dict]] = {}
+    for arcname, info in duplicates.items():
+        by_source.setdefault(info['source'], {})[arcname] = info
+    return {source: int(len(duplicates_manifest(group).encode()) * GROWTH_FACTOR) + 1
+        for source, group in by_source.items()}
+
+def plan_volumes(members: list[ArchiveMember], volume_size: int,
+        duplicates: dict[str, dict]=None) -> list[list[ArchiveMember]]:
+    """
+    plan_volumes Packs members into volumes before anything is encoded, for solid volumes where
+    compression runs across files so sizes are only known once a whole volume is written. Sizes
+    are upper bounds on what each member can take up so no volume goes over the cap
+
+    Args:
+        members (list[ArchiveMember]): Members to pack, in walk order so related files stay
+            together
+        volume_size (int): Max size of a volume in bytes
+        duplicates (dict[str, dict], optional): Duplicates recorded by `dedupe_members`.
+            Defaults to None.
+
+    Raises:
+        ValueError: If a member can't fit in a volume on its own
+
+    Returns:
+        list[list[ArchiveMember]]: Members of each volume
+    """
+    dup_costs = duplicate_costs(duplicates or {})
+    volumes: list[list[ArchiveMember]] = []
+    used = volume_size
+    for member in members:
+        cost = int(solid_member_size(member) * GROWTH_FACTOR) + 1 \
+            + dup_costs.get(member.arcname, 0)
+        if cost + VOLUME_RESERVE > volume_size:
+            raise ValueError(f"{member.arcname} is {member.size} bytes, can't fit in a volume "\
+                + f"of {volume_size} bytes")
+        if used + cost > volume_size:
+            volumes.append([])
+            used = VOLUME_RESERVE
+        volumes[-1].append(member)
+        used += cost
+    return volumes
+
+def write_index(index_path: Path, volumes: dict[str, list[str]]) -> None:
+    """
+    write_index Writes the volume index atomically
+
+    Args:
+        index_path (Path): Path of the volume index
+        volumes (dict[str, list[str]]): Volume file names to the names of the files they hold
+    """
+    write_json(index_path, {'version': INDEX_VERSION, 'volumes': volumes})
+
+def load_index(index_path: Path) -> dict[str, list[str]]:
+    """
+    load_index Reads a volume index
+
+    Args:
+        index_path (Path): Path of the volume index
+
+    Raises:
+        ValueError: If index isn't valid JSON, is malformed or its version isn't supported
+
+    Returns:
+        dict[str, list[str]]: Volume file names to the names of the files they hold
+    """
+    with index_path.open('r', encoding='utf-8') as index_ref:
+        index = json.load(index_ref)
+    if not isinstance(index, dict) or not isinstance(index.get('volumes'), dict):
+        raise ValueError(f"Malformed volume index {index_path}")
+    if index.get('version')!=INDEX_VERSION:
+        raise ValueError(f"Unsupported volume index version {index.get('version')}")
+    return index['volumes']
@@ -0,0 +1,221 @@
+"""walker.py
+
+Contains the directory walker collecting solution files for zipping, supports gitignore style
+exclusion patterns and prunes excluded directories without descending into them
+"""
+
+__author__ = "neo154"
+__version__ = '0.1.0'
+__all__ = ['GITIGNORE', 'SOLUTION_IGNORE', 'walk_solution']
+
+import os
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from .archive import ArchiveMember
+
+SOLUTION_IGNORE = '.solutionignore'
+GITIGNORE = '.gitignore'
+
+@dataclass
+class _IgnoreRule:
+    """Single compiled gitignore style pattern"""
+    base: str
+    regex: re.Pattern
+    anchored: bool
+    dir_only: bool
+    negate: bool
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        matches Checks if the rule applies to a path
+
+        Args:
+            rel_path (str): Path relative to the solution directory, `/` separated
+            is_dir (bool): Whether path is a directory
+
+        Returns:
+            bool: Whether the pattern matches the path
+        """
+        if self.dir_only and not is_dir:
+            return False
+        if not rel_path.startswith(self.base):
+            return False
+        if self.anchored:
+            return self.regex.match(rel_path[len(self.base):]) is not None
+        return self.regex.match(rel_path.rsplit('/', 1)[-1]) is not None
+
+def _translate(pattern: str) -> str:
+    """
+    _translate Translates a gitignore style glob to a regular expression, `*` and `?` don't match
+    across directories while `**` does
+
+    Args:
+        pattern (str): Glob pattern
+
+    Returns:
+        str: Regular expression matching the whole path
+    """
+    i, end = 0, len(pattern)
+    parts = []
+    while i < end:
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i]=='*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i]=='?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i]=='[' and (close := pattern.find(']', i + 2)) != -1:
+            body = pattern[i + 1:close].replace('\\', '\\\\')
+            if body[0] in '!^':
+                body = '^' + body[1:]
+            parts.append(f'[{body}]')
+            i = close + 1
+        elif pattern[i]=='\\' and i + 1 < end:
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return '(?s:' + ''.join(parts) + r')\Z'
+
+def _compile_rules(patterns: Iterable[str], base: str='') -> list[_IgnoreRule]:
+    """
+    _compile_rules Compiles gitignore style patterns, blank lines and comments are skipped
+
+    Args:
+        patterns (Iterable[str]): Patterns, plain file names match at any depth
+        base (str, optional): Directory the patterns are relative to, `/` terminated.
+            Defaults to solution directory.
+
+    Returns:
+        list[_IgnoreRule]: Compiled rules in order, last match wins
+    """
+    rules = []
+    for pattern in patterns:
+        pattern = pattern.rstrip('\n\r')
+        if not pattern.endswith('\\ '):
+            pattern = pattern.rstrip(' ')
+        if not pattern or pattern.startswith('#'):
+            continue
+        negate = pattern.startswith('!')
+        if negate:
+            pattern = pattern[1:]
+        elif pattern.startswith(('\\!', '\\#')):
+            pattern = pattern[1:]
+        dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        anchored = '/' in pattern
+        pattern = pattern.lstrip('/')
+        if not pattern:
+            continue
+        rules.append(_IgnoreRule(base, re.compile(_translate(pattern)), anchored, dir_only,
+            negate))
+    return rules
+
+def _is_ignored(rules: list[_IgnoreRule], rel_path: str, is_dir: bool) -> bool:
+    """
+    _is_ignored Checks path against rules, like git the last matching rule decides
+
+    Args:
+        rules (list[_IgnoreRule]): Rules that apply to the path's directory
+        rel_path (str): Path relative to the solution directory, `/` separated
+        is_dir (bool): Whether path is a directory
+
+    Returns:
+        bool: Whether path should be left out of the zip
+    """
+    for rule in reversed(rules):
+        if rule.matches(rel_path, is_dir):
+            return not rule.negate
+    return False
+
+def _scan_dir(dir_path: str, rel_dir: str, rules: list[_IgnoreRule],
+        ignore_names: tuple[str, ...]) -> tuple[Iterator[os.DirEntry], list[_IgnoreRule]]:
+    """
+    _scan_dir Lists a directory in sorted order and loads any ignore files in it
+
+    Args:
+        dir_path (str): Path of directory to scan
+        rel_dir (str): Directory relative to the solution directory, `/` terminated
+        rules (list[_IgnoreRule]): Rules inherited from parent directories
+        ignore_names (tuple[str, ...]): Names of ignore files to honor
+
+    Returns:
+        tuple[Iterator[os.DirEntry], list[_IgnoreRule]]: Directory entries and rules for them
+    """
+    with os.scandir(dir_path) as scan_ref:
+        entries = sorted(scan_ref, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.name in ignore_names and entry.is_file():
+            with open(entry.path, 'r', encoding='utf-8', errors='replace') as ignore_ref:
+                rules = rules + _compile_rules(ignore_ref, rel_dir)
+    return iter(entries), rules
+
+def walk_solution(solution_dir: Path, max_file_size: int, exclude_files: list[str]=None,
+        use_gitignore: bool=False) -> Iterator[ArchiveMember]:
+    """
+    walk_solution Iteratively walks a solution directory with `os.scandir`, reusing the stat data
+    of directory entries. Excluded directories are pruned before they are scanned. A directory
+    reached more than once through symlinks is only walked the first time, and links to a
+    directory holding the solution are skipped
+
+    Args:
+        solution_dir (Path): Path to solution directory
+        max_file_size (int): Max file size that will be compressed in bytes
+        exclude_files (list[str], optional): File names or gitignore style patterns to exclude,
+            relative to the solution directory. Defaults to None.
+        use_gitignore (bool, optional): Honor `.gitignore` files along with `.solutionignore`.
+            Defaults to False.
+
+    Raises:
+        ValueError: If file found isn't a directory or normal file
+
+    Yields:
+        ArchiveMember: Files to be added to the zip, in sorted order
+    """
+    ignore_names = (SOLUTION_IGNORE, GITIGNORE) if use_gitignore else (SOLUTION_IGNORE,)
+    root_name = solution_dir.name
+    stack = [(*_scan_dir(str(solution_dir), '', _compile_rules(exclude_files or []),
+        ignore_names), '')]
+    # Guards against symlinked directories looping back on themselves, a link to a directory
+    # holding the solution would walk the solution again
+    visited = {(dir_stat.st_dev, dir_stat.st_ino) for dir_stat in
+        (ancestor.stat() for ancestor in [solution_dir, *solution_dir.resolve().parents])}
+    while stack:
+        entries, rules, rel_dir = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        rel_path = rel_dir + entry.name
+        is_dir = entry.is_dir()
+        if _is_ignored(rules, rel_path, is_dir):
+            print(f"{rel_path} is excluded, ignoring for zip")
+        elif is_dir:
+            # Every directory is recorded, not only links, so a link is caught at its first
+            # step back into the tree
+            dir_stat = entry.stat()
+            if (dir_stat.st_dev, dir_stat.st_ino) in visited:
+                print(f"{rel_path} leads to a directory already walked, ignoring for zip")
+                continue
+            visited.add((dir_stat.st_dev, dir_stat.st_ino))
+            stack.append((*_scan_dir(entry.path, f'{rel_path}/', rules, ignore_names),
+                f'{rel_path}/'))
+        elif entry.is_file():
+            file_stat = entry.stat()
+            if file_stat.st_size > max_file_size:
+                print(f"{entry.path} was larger than {max_file_size} bytes, not adding to zip")
+                continue
+            yield ArchiveMember(Path(entry.path), f'{root_name}/{rel_path}', file_stat.st_size,
+                file_stat.st_mtime, file_stat.st_mode)
+        else:
+            raise ValueError(f'{entry.path} not a file or directory')
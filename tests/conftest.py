@@ -0,0 +1,50 @@
+"""conftest.py
+
+Shared fixtures, solution trees and local bare repos standing in for the remotes
+"""
+
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from solution_zipper.config import RESERVED_NAME, save_config
+
+def _git(*args: str, cwd: Path=None) -> None:
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True)
+
+def _remote_and_clone(root: Path, name: str) -> Path:
+    """Bare repo with a main branch and a clone of it to work in"""
+    _git('init', '--quiet', '--bare', '--initial-branch=main', str(root.joinpath(f'{name}.git')))
+    work_dir = root.joinpath(name)
+    _git('clone', '--quiet', root.joinpath(f'{name}.git').as_uri(), str(work_dir))
+    _git('checkout', '--quiet', '-B', 'main', cwd=work_dir)
+    work_dir.joinpath('README.md').write_text(name, encoding='utf-8')
+    _git('add', 'README.md', cwd=work_dir)
+    _git('commit', '--quiet', '-m', 'init', cwd=work_dir)
+    _git('push', '--quiet', 'origin', 'main', cwd=work_dir)
+    return work_dir
+
+@pytest.fixture
+def git_env(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> dict[str, Path]:
+    """Solution info and challenge repos with `file://` remotes, registered in a config"""
+    for key, value in {'GIT_AUTHOR_NAME': 'test', 'GIT_AUTHOR_EMAIL': 'test@example.com',
+            'GIT_COMMITTER_NAME': 'test', 'GIT_COMMITTER_EMAIL': 'test@example.com',
+            'GIT_CONFIG_GLOBAL': os.devnull, 'GIT_CONFIG_NOSYSTEM': '1'}.items():
+        monkeypatch.setenv(key, value)
+    info_dir = _remote_and_clone(tmp_path, 'info')
+    chal_dir = _remote_and_clone(tmp_path, 'chal')
+    config_path = tmp_path.joinpath('config.json')
+    save_config(config_path, {RESERVED_NAME: str(info_dir.resolve()),
+        'chal': str(chal_dir.resolve())})
+    return {'root': tmp_path, 'info': info_dir, 'chal': chal_dir, 'config': config_path}
+
+@pytest.fixture
+def solution_dir(tmp_path: Path) -> Path:
+    """Small solution with compressible and incompressible files"""
+    solution = tmp_path.joinpath('sol')
+    solution.joinpath('notes').mkdir(parents=True)
+    solution.joinpath('notes', 'writeup.md').write_text('# Writeup\n' * 2000, encoding='utf-8')
+    solution.joinpath('loot.bin').write_bytes(os.urandom(20000))
+    return solution
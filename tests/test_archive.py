@@ -0,0 +1,35 @@
+"""test_archive.py
+
+Concurrent encoding has to produce the same archive layout as encoding inline
+"""
+
+import os
+
+import pyzipper
+import pytest
+
+from solution_zipper.solution_zipper import zip_solution
+
+def _entries(zip_path) -> list[tuple[str, bytes]]:
+    with pyzipper.AESZipFile(zip_path) as zip_ref:
+        zip_ref.setpassword(b'pw')
+        return [(info.filename, zip_ref.read(info)) for info in zip_ref.infolist()]
+
+def test_workers_keep_walk_order(tmp_path):
+    solution = tmp_path.joinpath('sol')
+    solution.mkdir()
+    for number in range(40):
+        # Mixed sizes so workers finish out of order
+        size = 200000 if number % 7 == 0 else 100
+        solution.joinpath(f'f{number:02d}.txt').write_bytes(os.urandom(size // 2).hex().encode())
+    inline = zip_solution(solution, 'pw', workers=1).zip_path
+    inline = inline.rename(tmp_path.joinpath('inline.zip'))
+    parallel = zip_solution(solution, 'pw', workers=8).zip_path
+    assert [name for name, _ in _entries(parallel)] == [f'sol/f{number:02d}.txt'
+        for number in range(40)]
+    assert _entries(parallel) == _entries(inline)
+
+def test_workers_must_be_positive(solution_dir):
+    with pytest.raises(ValueError):
+        zip_solution(solution_dir, 'pw', workers=0)
+    assert not solution_dir.parent.joinpath('sol.zip').exists()
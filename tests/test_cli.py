@@ -0,0 +1,40 @@
+"""test_cli.py
+
+Entry point startup, help and argument errors don't import git or pyzipper
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import solution_zipper
+
+SRC_DIR = str(Path(solution_zipper.__file__).parents[1])
+HEAVY_MODULES = ('git', 'pyzipper')
+# Runs the entry point in a fresh interpreter and reports which heavy modules got imported
+PROBE = f'''
+import sys
+from solution_zipper.cli import main
+sys.argv = ['zip_solution', *sys.argv[1:]]
+try:
+    main()
+except SystemExit:
+    pass
+print(sorted(name for name in {HEAVY_MODULES!r} if name in sys.modules))
+'''
+
+@pytest.mark.parametrize('args', [['--help'], ['zipper', '--help'], ['zipper'],
+    ['manage_solution', 'zip_and_store', '--help'], ['verify', '--help']])
+def test_help_imports_no_heavy_modules(args):
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join([SRC_DIR, os.environ.get('PYTHONPATH', '')])}
+    run = subprocess.run([sys.executable, '-c', PROBE, *args], env=env, capture_output=True,
+        text=True, check=True)
+    assert run.stdout.strip().splitlines()[-1] == '[]'
+
+def test_lazy_names_resolve():
+    assert sorted(solution_zipper.__all__) == sorted(solution_zipper._LAZY_NAMES)
+    for name in solution_zipper.__all__:
+        assert getattr(solution_zipper, name).__name__ == name
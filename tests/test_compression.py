@@ -0,0 +1,37 @@
+"""test_compression.py
+
+Codec selection, already compressed members are stored instead of compressed again
+"""
+
+import os
+
+import pyzipper
+
+from solution_zipper.compression import select_codec
+from solution_zipper.solution_zipper import zip_solution
+
+def test_compressed_extension_is_stored():
+    compress_type, decision = select_codec('sol/capture.ZIP', b'text' * 1000,
+        pyzipper.ZIP_LZMA)
+    assert compress_type == pyzipper.ZIP_STORED
+    assert decision == 'stored, .zip is already compressed'
+
+def test_incompressible_sample_is_stored():
+    compress_type, decision = select_codec('sol/loot.bin', os.urandom(4096),
+        pyzipper.ZIP_DEFLATED)
+    assert compress_type == pyzipper.ZIP_STORED
+    assert decision.startswith('stored, sample ratio')
+
+def test_compressible_and_tiny_samples_keep_codec():
+    assert select_codec('sol/notes.md', b'line\n' * 1000, pyzipper.ZIP_BZIP2) \
+        == (pyzipper.ZIP_BZIP2, 'bzip2')
+    assert select_codec('sol/key.bin', os.urandom(16), pyzipper.ZIP_DEFLATED)[0] \
+        == pyzipper.ZIP_DEFLATED
+
+def test_zip_stores_incompressible_members(solution_dir):
+    result = zip_solution(solution_dir, 'pw', compression=pyzipper.ZIP_LZMA)
+    with pyzipper.AESZipFile(result.zip_path) as zip_ref:
+        zip_ref.setpassword(b'pw')
+        assert zip_ref.getinfo('sol/loot.bin').compress_type == pyzipper.ZIP_STORED
+        assert zip_ref.getinfo('sol/notes/writeup.md').compress_type == pyzipper.ZIP_LZMA
+        assert zip_ref.read('sol/loot.bin') == solution_dir.joinpath('loot.bin').read_bytes()
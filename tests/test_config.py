@@ -0,0 +1,47 @@
+"""test_config.py
+
+Resolving solutions and zips to the challenge repo holding them, and the config cache
+"""
+
+import pytest
+
+from solution_zipper.config import RESERVED_NAME, load_config, save_config, write_json
+
+@pytest.fixture
+def config(tmp_path):
+    for rel_path in ('info/chal', 'htb', 'htb/machines', 'htb-old'):
+        tmp_path.joinpath(rel_path).mkdir(parents=True)
+    return save_config(tmp_path.joinpath('config.json'), {
+        RESERVED_NAME: str(tmp_path.joinpath('info')),
+        'htb': str(tmp_path.joinpath('htb')),
+        'machines': str(tmp_path.joinpath('htb', 'machines')),
+        'htb_old': str(tmp_path.joinpath('htb-old')),
+    })
+
+def test_deepest_repo_wins(config, tmp_path):
+    assert config.locate_solution(tmp_path.joinpath('htb', 'machines', 'Sea'))[0] == 'machines'
+    assert config.locate_solution(tmp_path.joinpath('htb', 'machines', 'Sea', 'sub'))[0] \
+        == 'machines'
+    assert config.locate_solution(tmp_path.joinpath('htb', 'Chemistry'))[0] == 'htb'
+
+def test_prefix_is_matched_by_path_not_string(config, tmp_path):
+    assert config.locate_solution(tmp_path.joinpath('htb-old', 'Sea'))[0] == 'htb_old'
+    with pytest.raises(ValueError):
+        config.locate_solution(tmp_path.joinpath('htb2', 'Sea'))
+    # A repo's own directory isn't a solution inside it
+    with pytest.raises(ValueError):
+        config.locate_solution(tmp_path.joinpath('htb-old'))
+
+def test_lookup_password_resolves_zip_names(config, tmp_path):
+    tmp_path.joinpath('info', 'machines').mkdir()
+    tmp_path.joinpath('info', 'machines', 'Sea').write_text('flag{sea}\n', encoding='utf-8')
+    for name in ('Sea.zip', 'Sea.part02.zip', 'Sea.index.json'):
+        assert config.lookup_password(tmp_path.joinpath('htb', 'machines', name)) == 'flag{sea}'
+    with pytest.raises(FileNotFoundError):
+        config.lookup_password(tmp_path.joinpath('htb', 'Sea.zip'))
+
+def test_config_cache_sees_replaced_file(config):
+    assert load_config(config.path) is config
+    # Atomic writes replace the inode, so even a change within one mtime tick is seen
+    write_json(config.path, {**config.repos, 'extra': '/nowhere'})
+    assert 'extra' in load_config(config.path).repos
@@ -0,0 +1,43 @@
+"""test_dedupe.py
+
+Duplicate contents are stored once and recreated on extract
+"""
+
+import os
+
+import pyzipper
+
+from solution_zipper.dedupe import DUPLICATES_NAME
+from solution_zipper.extract import extract_zip
+from solution_zipper.solution_zipper import zip_solution
+
+def test_dedupe_round_trip(tmp_path):
+    solution = tmp_path.joinpath('sol')
+    solution.joinpath('scans').mkdir(parents=True)
+    data = os.urandom(4096)
+    for rel_path in ('scans/a.bin', 'scans/b.bin', 'c.bin'):
+        solution.joinpath(rel_path).write_bytes(data)
+    # Same size but different contents has to be stored on its own
+    solution.joinpath('d.bin').write_bytes(os.urandom(4096))
+    # Duplicates keep their own mode and mtime
+    solution.joinpath('scans', 'b.bin').chmod(0o600)
+    os.utime(solution.joinpath('scans', 'b.bin'), (1700000000, 1700000000))
+    result = zip_solution(solution, 'pw', dedupe=True)
+    # Walk is sorted by name, so c.bin is seen before anything under scans
+    assert result.duplicates == {'sol/scans/a.bin': 'sol/c.bin', 'sol/scans/b.bin': 'sol/c.bin'}
+    with pyzipper.AESZipFile(result.zip_path) as zip_ref:
+        assert sorted(zip_ref.namelist()) == sorted([DUPLICATES_NAME, 'sol/c.bin', 'sol/d.bin'])
+    extract_zip(result.zip_path, 'pw', tmp_path.joinpath('out'))
+    out = tmp_path.joinpath('out', 'sol')
+    for rel_path in ('scans/a.bin', 'scans/b.bin', 'c.bin', 'd.bin'):
+        assert out.joinpath(rel_path).read_bytes() == solution.joinpath(rel_path).read_bytes()
+    assert not out.parent.joinpath(DUPLICATES_NAME).exists()
+    assert out.joinpath('scans', 'b.bin').stat().st_mode & 0o777 == 0o600
+    assert out.joinpath('scans', 'b.bin').stat().st_mtime == 1700000000
+
+def test_small_files_are_not_deduplicated(tmp_path):
+    solution = tmp_path.joinpath('sol')
+    solution.mkdir()
+    for name in ('a.txt', 'b.txt'):
+        solution.joinpath(name).write_text('flag', encoding='utf-8')
+    assert zip_solution(solution, 'pw', dedupe=True).duplicates == {}
@@ -0,0 +1,118 @@
+"""test_git_solutions.py
+
+Publishing and rollback of zip_and_store and its batch version against local bare repos, and
+the privacy probe cache
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+import git
+import pytest
+from git.exc import GitCommandError
+
+from solution_zipper import git_solutions
+from solution_zipper.git_solutions import _check_private_repo, zip_and_store, zip_and_store_many
+from solution_zipper.verify import verify_zip
+
+def _remote_branches(bare_repo: Path) -> list[str]:
+    return [head.name for head in git.Repo(bare_repo).heads]
+
+def test_zip_and_store_pushes_both_branches(git_env, solution_dir):
+    solution = shutil.move(solution_dir, git_env['chal'].joinpath('sol'))
+    zip_and_store(Path(solution), git_env['config'], password='flag{test}')
+    chal_remote = git.Repo(git_env['root'].joinpath('chal.git'))
+    info_remote = git.Repo(git_env['root'].joinpath('info.git'))
+    assert 'sol.zip' in [blob.path for blob in chal_remote.heads['sol'].commit.tree.blobs]
+    password = info_remote.heads['chal_sol'].commit.tree['chal/sol'].data_stream.read()
+    assert password == b'flag{test}'
+    zip_path = git_env['root'].joinpath('sol.zip')
+    zip_path.write_bytes(chal_remote.heads['sol'].commit.tree['sol.zip'].data_stream.read())
+    assert verify_zip(zip_path, 'flag{test}').ok
+    for repo_dir in (git_env['info'], git_env['chal']):
+        repo = git.Repo(repo_dir)
+        assert repo.active_branch.name == 'main'
+        assert not repo.is_dirty()
+
+def test_zip_and_store_spills_large_zips(git_env, solution_dir, monkeypatch):
+    # Zip is bigger than the spool, so it's staged into git from a temp file
+    monkeypatch.setattr(git_solutions, 'BLOB_SPOOL_SIZE', 1024)
+    solution = shutil.move(solution_dir, git_env['chal'].joinpath('sol'))
+    zip_and_store(Path(solution), git_env['config'], password='flag{test}')
+    zip_blob = git.Repo(git_env['root'].joinpath('chal.git')).heads['sol'].commit.tree['sol.zip']
+    assert zip_blob.size > 1024
+    zip_path = git_env['root'].joinpath('sol.zip')
+    zip_path.write_bytes(zip_blob.data_stream.read())
+    assert verify_zip(zip_path, 'flag{test}').ok
+    # Zip only ever went into git, never into the working tree
+    assert not git_env['chal'].joinpath('sol.zip').exists()
+
+def test_zip_and_store_rolls_back_rejected_push(git_env, solution_dir):
+    hook = git_env['root'].joinpath('chal.git', 'hooks', 'pre-receive')
+    hook.write_text('#!/bin/sh\nexit 1\n', encoding='utf-8')
+    hook.chmod(0o755)
+    solution = shutil.move(solution_dir, git_env['chal'].joinpath('sol'))
+    with pytest.raises(GitCommandError):
+        zip_and_store(Path(solution), git_env['config'], password='flag{test}')
+    # Info side was pushed before the challenge push failed, it has to be removed again
+    assert _remote_branches(git_env['root'].joinpath('info.git')) == ['main']
+    assert _remote_branches(git_env['root'].joinpath('chal.git')) == ['main']
+    for repo_dir in (git_env['info'], git_env['chal']):
+        repo = git.Repo(repo_dir)
+        assert [head.name for head in repo.heads] == ['main']
+        assert not repo.is_dirty()
+    assert not git_env['chal'].joinpath('sol.zip').exists()
+    assert not git_env['info'].joinpath('chal', 'sol').exists()
+
+def _make_solution(solution_dir: Path) -> Path:
+    solution_dir.mkdir(parents=True)
+    solution_dir.joinpath('notes.md').write_text(f'{solution_dir}\n' * 100, encoding='utf-8')
+    return solution_dir
+
+def test_batch_stores_good_and_skips_failed(git_env):
+    good = _make_solution(git_env['chal'].joinpath('good'))
+    bad = _make_solution(git_env['chal'].joinpath('bad'))
+    os.mkfifo(bad.joinpath('pipe'))
+    results = zip_and_store_many([good, bad], git_env['config'], password='pw', workers=2,
+        branch='b1')
+    assert results[good.resolve()].ok and not results[bad.resolve()].ok
+    info_tree = git.Repo(git_env['root'].joinpath('info.git')).heads['b1'].commit.tree
+    assert [blob.path for blob in info_tree['chal'].blobs] == ['chal/good']
+    chal_tree = git.Repo(git_env['root'].joinpath('chal.git')).heads['b1'].commit.tree
+    assert 'good.zip' in [blob.path for blob in chal_tree.blobs]
+    assert 'bad.zip' not in [blob.path for blob in chal_tree.blobs]
+    assert not git_env['chal'].joinpath('bad.zip').exists()
+    # Manifests are only for local updates, they'd be left untracked in the challenge repo
+    assert not git_env['chal'].joinpath('good.zip.manifest.json').exists()
+    for repo_dir in (git_env['info'], git_env['chal']):
+        assert git.Repo(repo_dir).active_branch.name == 'main'
+
+def test_batch_rejects_solutions_sharing_a_password_path(git_env):
+    easy = _make_solution(git_env['chal'].joinpath('easy', 'foo'))
+    hard = _make_solution(git_env['chal'].joinpath('hard', 'foo'))
+    with pytest.raises(ValueError, match='chal/foo'):
+        zip_and_store_many([easy, hard], git_env['config'], password='pw', branch='b1')
+    # Rejected before anything is zipped or branched
+    assert not easy.parent.joinpath('foo.zip').exists()
+    assert not hard.parent.joinpath('foo.zip').exists()
+    for repo_dir in (git_env['info'], git_env['chal']):
+        assert [head.name for head in git.Repo(repo_dir).heads] == ['main']
+
+def test_private_probe_only_caches_private(git_env):
+    cache_path = git_env['root'].joinpath('privacy_cache.json')
+    repo = git.Repo(git_env['chal'])
+    # file:// remotes are always readable, so look public
+    assert not _check_private_repo(repo, cache_path)
+    assert cache_path.read_text(encoding='utf-8').strip() == '{}'
+    git_env['root'].joinpath('chal.git').rename(git_env['root'].joinpath('gone.git'))
+    assert _check_private_repo(repo, cache_path)
+    git_env['root'].joinpath('gone.git').rename(git_env['root'].joinpath('chal.git'))
+    # Cached private result is reused within the TTL
+    assert _check_private_repo(repo, cache_path)
+    assert not _check_private_repo(repo, cache_path, ttl=0)
+
+def test_private_probe_ignores_corrupt_cache(git_env):
+    cache_path = git_env['root'].joinpath('privacy_cache.json')
+    cache_path.write_text('{not json', encoding='utf-8')
+    assert not _check_private_repo(git.Repo(git_env['chal']), cache_path)
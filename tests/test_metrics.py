@@ -0,0 +1,36 @@
+"""test_metrics.py
+
+Metrics collected while zipping, hooks and reports merged from worker processes
+"""
+
+import json
+
+from solution_zipper.metrics import MetricsCollector, format_report
+from solution_zipper.solution_zipper import create_zip_files, zip_solution
+
+def test_zip_records_phases_and_members(solution_dir):
+    events = []
+    metrics = MetricsCollector([events.append])
+    zip_solution(solution_dir, 'pw', metrics=metrics)
+    report = metrics.report()
+    assert {'walk', 'zip'} <= set(report['phase_totals'])
+    assert report['member_totals']['count'] == 2
+    assert report['member_totals']['bytes_in'] == 20000 + len('# Writeup\n' * 2000)
+    assert sorted(member['name'] for member in report['members']) == ['sol/loot.bin',
+        'sol/notes/writeup.md']
+    # Hooks see every event as it's recorded
+    assert len(events) == len(report['phases']) + len(report['members'])
+    json.dumps(report)
+    assert 'sol/notes/writeup.md' in format_report(report)
+
+def test_batch_merges_worker_reports(tmp_path):
+    for name in ('one', 'two'):
+        tmp_path.joinpath(name).mkdir()
+        tmp_path.joinpath(name, 'notes.md').write_text(name * 1000, encoding='utf-8')
+    metrics = MetricsCollector()
+    create_zip_files([tmp_path.joinpath('one'), tmp_path.joinpath('two')], 'pw', workers=2,
+        metrics=metrics)
+    report = metrics.report()
+    assert sorted(member['name'] for member in report['members']) == ['one/notes.md',
+        'two/notes.md']
+    assert report['phase_totals']['zip']['count'] == 2
@@ -0,0 +1,39 @@
+"""test_solid.py
+
+Solid zips hold the tree as one tar in a single encrypted entry
+"""
+
+import os
+
+import pyzipper
+import pytest
+
+from solution_zipper.extract import extract_zip
+from solution_zipper.solid import SOLID_NAME
+from solution_zipper.solution_zipper import zip_solution
+
+def test_solid_round_trip(solution_dir, tmp_path):
+    solution_dir.joinpath('loot.bin').chmod(0o600)
+    os.utime(solution_dir.joinpath('loot.bin'), (1700000000, 1700000000))
+    result = zip_solution(solution_dir, 'pw', solid=True, compression=pyzipper.ZIP_LZMA)
+    with pyzipper.AESZipFile(result.zip_path) as zip_ref:
+        assert zip_ref.namelist() == [SOLID_NAME]
+    extract_zip(result.zip_path, 'pw', tmp_path.joinpath('out'))
+    out = tmp_path.joinpath('out', 'sol')
+    for rel_path in ('loot.bin', 'notes/writeup.md'):
+        assert out.joinpath(rel_path).read_bytes() == solution_dir.joinpath(rel_path).read_bytes()
+    # Tar keeps mode and mtime, unlike plain zip entries
+    assert out.joinpath('loot.bin').stat().st_mode & 0o777 == 0o600
+    assert out.joinpath('loot.bin').stat().st_mtime == 1700000000
+
+def test_solid_selective_extract(solution_dir, tmp_path):
+    result = zip_solution(solution_dir, 'pw', solid=True)
+    extracted = extract_zip(result.zip_path, 'pw', tmp_path.joinpath('out'),
+        ['sol/notes/writeup.md'])
+    assert extracted == [tmp_path.joinpath('out', 'sol', 'notes', 'writeup.md')]
+    assert not tmp_path.joinpath('out', 'sol', 'loot.bin').exists()
+
+@pytest.mark.parametrize('options', [{'update': True}, {'dedupe': True}])
+def test_solid_rejects_update_and_dedupe(solution_dir, options):
+    with pytest.raises(ValueError):
+        zip_solution(solution_dir, 'pw', solid=True, **options)
@@ -0,0 +1,69 @@
+"""test_solution_zipper.py
+
+Single and batch zipping of solution directories
+"""
+
+import io
+import os
+
+import pyzipper
+
+from solution_zipper.manifest import get_manifest_path, hash_file, load_manifest, password_key
+from solution_zipper.solution_zipper import create_zip_files, find_solution_dirs, zip_solution
+from solution_zipper.verify import verify_zip
+
+def test_batch_keeps_going_past_failed_solution(tmp_path):
+    for name in ('bad', 'good'):
+        tmp_path.joinpath(name).mkdir()
+        tmp_path.joinpath(name, 'notes.md').write_text(f'{name}\n' * 1000, encoding='utf-8')
+    # Walker rejects anything that isn't a file or directory, after the zip was opened
+    os.mkfifo(tmp_path.joinpath('bad', 'pipe'))
+    solution_dirs = find_solution_dirs(tmp_path)
+    results = create_zip_files(solution_dirs, 'pw', workers=2)
+    assert results[tmp_path.joinpath('good')].ok
+    assert verify_zip(tmp_path.joinpath('good.zip'), 'pw').ok
+    assert results[tmp_path.joinpath('bad')].error.startswith('ValueError')
+    # A partial zip would make the next run fail with FileExistsError
+    assert not tmp_path.joinpath('bad.zip').exists()
+    tmp_path.joinpath('bad', 'pipe').unlink()
+    assert create_zip_files([tmp_path.joinpath('bad')], 'pw')[tmp_path.joinpath('bad')].ok
+
+def test_update_carries_over_unchanged_and_drops_deleted(solution_dir):
+    result = zip_solution(solution_dir, 'pw')
+    # Manifest comes from the first zip, so the first update already carries files over
+    assert get_manifest_path(result.zip_path).is_file()
+    solution_dir.joinpath('notes', 'writeup.md').write_text('# Rewritten\n', encoding='utf-8')
+    solution_dir.joinpath('loot.bin').unlink()
+    solution_dir.joinpath('new.txt').write_text('new\n', encoding='utf-8')
+    solution_dir.joinpath('kept.txt').write_text('kept\n' * 100, encoding='utf-8')
+    zip_solution(solution_dir, 'pw', update=True)
+    solution_dir.joinpath('new.txt').write_text('newer\n', encoding='utf-8')
+    update = zip_solution(solution_dir, 'pw', update=True)
+    assert update.codecs['sol/kept.txt'] == 'carried over'
+    assert update.codecs['sol/notes/writeup.md'] == 'carried over'
+    assert update.codecs['sol/new.txt'] != 'carried over'
+    with pyzipper.AESZipFile(update.zip_path) as zip_ref:
+        zip_ref.setpassword(b'pw')
+        assert sorted(zip_ref.namelist()) == ['sol/kept.txt', 'sol/new.txt',
+            'sol/notes/writeup.md']
+        assert zip_ref.read('sol/new.txt') == b'newer\n'
+
+def test_first_update_carries_over_everything(solution_dir):
+    result = zip_solution(solution_dir, 'pw')
+    # Hashes taken while encoding have to match the ones an update takes from disk
+    entries = load_manifest(get_manifest_path(result.zip_path))
+    assert entries['sol/loot.bin']['hash'] == hash_file(solution_dir.joinpath('loot.bin'),
+        password_key('pw'))
+    update = zip_solution(solution_dir, 'pw', update=True)
+    assert set(update.codecs.values()) == {'carried over'}
+
+def test_target_leaves_nothing_on_disk(solution_dir):
+    target = io.BytesIO()
+    result = zip_solution(solution_dir, 'pw', target=target)
+    assert not result.zip_path.exists()
+    assert not get_manifest_path(result.zip_path).exists()
+    # Target is left open for the caller
+    target.seek(0)
+    with pyzipper.AESZipFile(target) as zip_ref:
+        zip_ref.setpassword(b'pw')
+        assert zip_ref.read('sol/loot.bin') == solution_dir.joinpath('loot.bin').read_bytes()
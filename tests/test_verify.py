@@ -0,0 +1,71 @@
+"""test_verify.py
+
+Corrupt zips and missing passwords are reported as failed results instead of stopping the audit
+"""
+
+import sys
+from pathlib import Path
+
+import pyzipper
+import pytest
+
+from solution_zipper import cli
+from solution_zipper.solution_zipper import zip_solution
+from solution_zipper.verify import verify_zip, verify_zips
+
+def _flip_bits(zip_path: Path, offset: int, copy_to: Path) -> Path:
+    data = bytearray(zip_path.read_bytes())
+    data[offset] ^= 0x10
+    copy_to.write_bytes(data)
+    return copy_to
+
+@pytest.fixture
+def lzma_zip(solution_dir: Path) -> Path:
+    return zip_solution(solution_dir, 'pw', compression=pyzipper.ZIP_LZMA).zip_path
+
+def test_verify_good_zip(lzma_zip):
+    result = verify_zip(lzma_zip, 'pw')
+    assert result.ok and result.members == 2
+
+def _lzma_payload(zip_path: Path) -> range:
+    with pyzipper.AESZipFile(zip_path) as zip_ref:
+        info = next(info for info in zip_ref.filelist if info.compress_type==pyzipper.ZIP_LZMA)
+    # Local header, AES salt and password verifier come first, HMAC comes last
+    start = info.header_offset + 30 + len(info.filename.encode()) + len(info.extra) + 18
+    return range(start, start + info.compress_size - 28)
+
+def test_verify_reports_corrupt_lzma(lzma_zip, tmp_path):
+    errors = set()
+    for offset in _lzma_payload(lzma_zip):
+        result = verify_zip(_flip_bits(lzma_zip, offset, tmp_path.joinpath('bad.zip')), 'pw')
+        assert not result.ok, offset
+        errors.add(result.error.split(':')[0])
+    # Decompressor errors have to be reported too, not only the HMAC mismatch
+    assert 'LZMAError' in errors
+
+def test_verify_zips_keeps_going_past_failures(lzma_zip, tmp_path):
+    bad_zip = _flip_bits(lzma_zip, _lzma_payload(lzma_zip)[-1], tmp_path.joinpath('bad.zip'))
+    results = verify_zips({lzma_zip: 'pw', bad_zip: 'pw'}, workers=2)
+    assert results[lzma_zip].ok
+    assert not results[bad_zip].ok
+
+def test_cli_verify_reports_failed_lookups(git_env, lzma_zip, monkeypatch, capsys):
+    # Zip isn't in any registered challenge repo, so its password can't be looked up
+    monkeypatch.setattr(sys, 'argv', ['solution_zipper', 'verify', str(lzma_zip),
+        '--config_path', str(git_env['config'])])
+    with pytest.raises(ValueError, match='1/1 zips failed'):
+        cli.main()
+    assert f'{lzma_zip}: failed, ValueError' in capsys.readouterr().out
+
+def test_cli_verify_reports_bad_indexes(lzma_zip, monkeypatch, capsys):
+    missing = lzma_zip.with_name('gone.index.json')
+    malformed = lzma_zip.with_name('broken.index.json')
+    malformed.write_text('[]', encoding='utf-8')
+    monkeypatch.setattr(sys, 'argv', ['solution_zipper', 'verify', str(missing), str(malformed),
+        str(lzma_zip), '--password', 'pw'])
+    with pytest.raises(ValueError, match='2/3 zips failed'):
+        cli.main()
+    output = capsys.readouterr().out
+    assert f'{missing}: failed, FileNotFoundError' in output
+    assert f'{malformed}: failed, ValueError: Malformed volume index' in output
+    assert f'{lzma_zip}: ok' in output
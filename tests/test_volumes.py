@@ -0,0 +1,75 @@
+"""test_volumes.py
+
+Every volume has to stay under the cap, whatever mode it was packed in
+"""
+
+import filecmp
+import os
+from pathlib import Path
+
+import pyzipper
+import pytest
+
+from solution_zipper.extract import extract_zip
+from solution_zipper.solution_zipper import zip_solution
+
+def _assert_under_cap(volumes: list[Path], volume_size: int) -> None:
+    assert volumes
+    for volume in volumes:
+        assert volume.stat().st_size <= volume_size, volume.name
+
+def _assert_same_tree(left: Path, right: Path) -> None:
+    comparison = filecmp.dircmp(left, right)
+    assert not comparison.left_only and not comparison.right_only
+    for name in comparison.common_files:
+        assert left.joinpath(name).read_bytes() == right.joinpath(name).read_bytes()
+    for name in comparison.common_dirs:
+        _assert_same_tree(left.joinpath(name), right.joinpath(name))
+
+def test_packed_volumes_under_cap(tmp_path):
+    solution = tmp_path.joinpath('sol')
+    solution.mkdir()
+    for number in range(30):
+        solution.joinpath(f'random{number}.bin').write_bytes(os.urandom(20000))
+        solution.joinpath(f'text{number}.txt').write_text(f'line {number}\n' * 3000)
+    result = zip_solution(solution, 'pw', volume_size=100000, workers=2)
+    _assert_under_cap(result.volumes, 100000)
+    extract_zip(result.zip_path, 'pw', tmp_path.joinpath('out'))
+    _assert_same_tree(solution, tmp_path.joinpath('out', 'sol'))
+
+def test_solid_volumes_under_cap(tmp_path):
+    solution = tmp_path.joinpath('sol')
+    solution.mkdir()
+    for number in range(400):
+        solution.joinpath(f'f{number:03d}.txt').write_bytes(os.urandom(600))
+    result = zip_solution(solution, 'pw', volume_size=200000, solid=True,
+        compression=pyzipper.ZIP_STORED)
+    _assert_under_cap(result.volumes, 200000)
+    extract_zip(result.zip_path, 'pw', tmp_path.joinpath('out'))
+    _assert_same_tree(solution, tmp_path.joinpath('out', 'sol'))
+
+def _long_source_with_copies(tmp_path: Path) -> Path:
+    solution = tmp_path.joinpath('sol')
+    solution.mkdir()
+    data = os.urandom(2000)
+    solution.joinpath('L' * 200).write_bytes(data)
+    for number in range(220):
+        solution.joinpath(f'c{number}').write_bytes(data)
+    for number in range(40):
+        solution.joinpath(f'z{number}').write_bytes(os.urandom(3000))
+    return solution
+
+def test_dedupe_manifest_counts_against_cap(tmp_path):
+    solution = _long_source_with_copies(tmp_path)
+    result = zip_solution(solution, 'pw', volume_size=90000, dedupe=True,
+        compression=pyzipper.ZIP_STORED)
+    _assert_under_cap(result.volumes, 90000)
+    extract_zip(result.zip_path, 'pw', tmp_path.joinpath('out'))
+    _assert_same_tree(solution, tmp_path.joinpath('out', 'sol'))
+
+def test_member_too_big_for_volume_leaves_nothing(tmp_path):
+    solution = _long_source_with_copies(tmp_path)
+    with pytest.raises(ValueError):
+        zip_solution(solution, 'pw', volume_size=60000, dedupe=True,
+            compression=pyzipper.ZIP_STORED)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['sol']
@@ -0,0 +1,51 @@
+"""test_walker.py
+
+Ignore patterns, pruning of excluded directories and symlink loops
+"""
+
+import os
+
+from solution_zipper import walker
+from solution_zipper.walker import walk_solution
+
+def _arcnames(solution_dir, **kwargs) -> list[str]:
+    return [member.arcname for member in walk_solution(solution_dir, 1 << 30, **kwargs)]
+
+def test_ignore_patterns(tmp_path):
+    solution = tmp_path.joinpath('sol')
+    for rel_path in ('notes.md', 'scan.log', 'keep.log', 'loot/a.bin', 'docs/build/out.html',
+            'docs/index.md', 'sub/.gitignore', 'sub/secret.txt', 'sub/plain.txt'):
+        solution.joinpath(rel_path).parent.mkdir(parents=True, exist_ok=True)
+        solution.joinpath(rel_path).write_text(rel_path, encoding='utf-8')
+    solution.joinpath('.solutionignore').write_text('*.log\n!keep.log\n/loot/\n',
+        encoding='utf-8')
+    solution.joinpath('sub', '.gitignore').write_text('secret.txt\n', encoding='utf-8')
+    assert _arcnames(solution, exclude_files=['docs/**/build']) == ['sol/.solutionignore',
+        'sol/docs/index.md', 'sol/keep.log', 'sol/notes.md', 'sol/sub/.gitignore',
+        'sol/sub/plain.txt', 'sol/sub/secret.txt']
+    assert 'sol/sub/secret.txt' not in _arcnames(solution, use_gitignore=True)
+
+def test_excluded_directory_is_never_scanned(tmp_path, monkeypatch):
+    solution = tmp_path.joinpath('sol')
+    solution.joinpath('node_modules', 'pkg').mkdir(parents=True)
+    solution.joinpath('node_modules', 'pkg', 'index.js').write_text('js', encoding='utf-8')
+    solution.joinpath('notes.md').write_text('notes', encoding='utf-8')
+    scanned = []
+    scan_dir = walker._scan_dir
+    def _record_scan(dir_path, *args):
+        scanned.append(os.path.relpath(dir_path, solution))
+        return scan_dir(dir_path, *args)
+    monkeypatch.setattr(walker, '_scan_dir', _record_scan)
+    assert _arcnames(solution, exclude_files=['node_modules/']) == ['sol/notes.md']
+    assert scanned == ['.']
+
+def test_symlink_loops_are_skipped(tmp_path):
+    solution = tmp_path.joinpath('sol')
+    solution.joinpath('sub').mkdir(parents=True)
+    solution.joinpath('sub', 'notes.md').write_text('notes', encoding='utf-8')
+    tmp_path.joinpath('sibling').mkdir()
+    tmp_path.joinpath('sibling', 'other.md').write_text('other', encoding='utf-8')
+    os.symlink('..', solution.joinpath('loop'))
+    os.symlink('..', solution.joinpath('sub', 'up'))
+    # Parent holds the solution along with other solutions, none of it belongs in the zip
+    assert _arcnames(solution) == ['sol/sub/notes.md']